@@ -1,24 +1,23 @@
 import os
 import sys
-from pathlib import Path
-
-# Add the parent directory to the Python path so imports work correctly
-current_dir = Path(__file__).parent
-parent_dir = current_dir.parent
-sys.path.insert(0, str(parent_dir))
 
 from flask import Flask, jsonify
 from flask_restful import Api
 from utils.logger import setup_logging
 from utils.exceptions import register_error_handlers, FactifyException
 from api.routes import initialize_routes
+from api.json_provider import ORJSONProvider, output_json
 from core.document_processor import DocumentProcessor # Import DocumentProcessor
+from core.models import warmup
 
 logger = setup_logging(__name__)
 
 def create_app():
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     api = Api(app)
+    # Serialize resource responses with orjson as well
+    api.representations['application/json'] = output_json
 
     # Register error handlers
     register_error_handlers(app)
@@ -35,10 +34,24 @@ def create_app():
     def health_check():
         return jsonify({"status": "healthy", "message": "Factify API is running!"}), 200
 
+    # Build deferred model schemas now; with gunicorn's preload_app this happens once, before forking
+    warmup()
+
     logger.info("Factify API application created and routes initialized.")
     return app
 
 if __name__ == '__main__':
+    import argparse
+
+    # Run from the project root as a module so top-level packages resolve: python -m api.app --dev
+    parser = argparse.ArgumentParser(description="Factify API application.")
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        help="Run the single-process Flask development server. In production, serve with: gunicorn -c gunicorn_conf.py 'api.app:create_app()'"
+    )
+    args = parser.parse_args()
+
     # Ensure a 'documents_to_process' directory exists for input files
     # Create dummy files for demonstration if they don't exist
     input_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documents_to_process")
@@ -75,5 +88,9 @@ if __name__ == '__main__':
         logger.warning(f"No earnings_sample.pdf found in {input_dir}. Please add sample PDFs to test.")
 
 
+    if not args.dev:
+        logger.info("Not starting the development server. Use --dev, or serve with: gunicorn -c gunicorn_conf.py 'api.app:create_app()'")
+        sys.exit(0)
+
     app = create_app()
-    app.run(debug=True, port=5000) 
\ No newline at end of file
+    app.run(debug=True, port=5000)
@@ -0,0 +1,31 @@
+import orjson
+from flask import make_response
+from flask.json.provider import JSONProvider
+
+# Metadata returned by the LLM is free-form, so tolerate non-string dict keys
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+class ORJSONProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+    Used by `jsonify` and any Flask response built from a dict or list.
+    """
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Builds a JSON response from the encoded bytes, skipping the str round trip."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=ORJSON_OPTIONS), mimetype="application/json")
+
+def output_json(data, code, headers=None):
+    """
+    Flask-RESTful representation for 'application/json' that serializes with orjson.
+    Flask-RESTful ignores the app's JSON provider, so resources need their own representation.
+    """
+    resp = make_response(orjson.dumps(data, option=ORJSON_OPTIONS), code)
+    resp.headers.extend(headers or {})
+    return resp
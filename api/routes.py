@@ -1,11 +1,6 @@
 import os
-import sys
-from pathlib import Path
-
-# Add the parent directory to the Python path so imports work correctly
-current_dir = Path(__file__).parent
-parent_dir = current_dir.parent
-sys.path.insert(0, str(parent_dir))
+import hashlib
+import tempfile
 
 from flask import request
 from flask_restful import Resource
@@ -14,10 +9,26 @@ from core.document_processor import DocumentProcessor
 from core.models import DocumentResult, ApiErrorResponse, ActionableItem
 from utils.logger import setup_logging
 from utils.exceptions import DocumentNotFoundError, InvalidInputError, DocumentProcessingError, LLMAPIError
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
 logger = setup_logging(__name__)
 
+# Validates and serializes a whole list of actionable items in one pydantic-core pass
+_ACTIONABLE_ITEMS_ADAPTER = TypeAdapter(List[ActionableItem])
+
+UPLOAD_COPY_BUFFER_SIZE = 1 << 20 # 1 MiB chunks when streaming uploads to disk
+
+def _save_upload(source, destination) -> str:
+    """
+    Streams an uploaded file into `destination` in large chunks, hashing it on the way.
+    Returns the hex digest of the uploaded bytes.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: source.read(UPLOAD_COPY_BUFFER_SIZE), b''):
+        hasher.update(chunk)
+        destination.write(chunk)
+    return hasher.hexdigest()
+
 class DocumentAnalyze(Resource):
     """
     API endpoint for processing and analyzing a new document.
@@ -43,42 +54,31 @@ class DocumentAnalyze(Resource):
         if not uploaded_file.filename.lower().endswith('.pdf'):
             raise InvalidInputError("Only PDF files are supported.")
         
-        # Create a temporary file to store the uploaded content
-        import tempfile
-        import uuid
-        
-        # Generate a unique temporary filename to avoid conflicts
-        temp_file_id = str(uuid.uuid4())
-        temp_filename = f"{temp_file_id}_{uploaded_file.filename}"
-        temp_file_path = os.path.join(tempfile.gettempdir(), temp_filename)
-        
+        # Uniquely named temporary file for the upload; removed in the finally block below
+        temp_file = tempfile.NamedTemporaryFile(prefix="factify_", suffix=".pdf", delete=False)
+        temp_file_path = temp_file.name
+
         try:
-            # Save the uploaded file to temporary location
-            uploaded_file.save(temp_file_path)
+            # Stream the uploaded file to the temporary location, hashing its content in the same pass
+            with temp_file:
+                content_hash = _save_upload(uploaded_file.stream, temp_file)
             logger.info(f"Received file '{uploaded_file.filename}', temporarily saved to {temp_file_path}")
-            
-            # Process the temporary file
-            processed_data = self.document_processor.process_document(temp_file_path)
-            
-            # Remove the temporary file
-            os.remove(temp_file_path)
-            logger.info(f"Removed temporary file: {temp_file_path}")
+
+            # Process the temporary file, reporting results under the uploaded filename.
+            # Re-uploads of identical content reuse the cached analysis.
+            processed_data = self.document_processor.process_document(
+                temp_file_path,
+                filename=uploaded_file.filename,
+                content_hash=content_hash
+            )
 
             # Validate output using Pydantic model (optional, as processor already returns dict from model)
             # DocumentResult(**processed_data)
 
             logger.info(f"Document {uploaded_file.filename} processed successfully. ID: {processed_data['document_id']}")
             return processed_data, 200 # Return 200 OK for successful processing
-            
+
         except ValidationError as e:
-            # Ensure temporary file is cleaned up
-            if os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.info(f"Cleaned up temporary file after validation error: {temp_file_path}")
-                except:
-                    logger.warning(f"Failed to clean up temporary file: {temp_file_path}")
-            
             # This catches validation errors if the processor's output doesn't conform to DocumentResult
             logger.error(f"Pydantic validation error after processing: {e.errors()}", exc_info=True)
             raise DocumentProcessingError(
@@ -86,38 +86,21 @@ class DocumentAnalyze(Resource):
                 details={"validation_errors": e.errors()}
             )
         except DocumentProcessingError as e:
-            # Ensure temporary file is cleaned up
-            if os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.info(f"Cleaned up temporary file after processing error: {temp_file_path}")
-                except:
-                    logger.warning(f"Failed to clean up temporary file: {temp_file_path}")
-            
             logger.error(f"Document processing failed: {e.message}")
             raise # Re-raise for centralized error handling
         except LLMAPIError as e:
-            # Ensure temporary file is cleaned up
-            if os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.info(f"Cleaned up temporary file after LLM error: {temp_file_path}")
-                except:
-                    logger.warning(f"Failed to clean up temporary file: {temp_file_path}")
-            
             logger.error(f"LLM API error during document analysis: {e.message}")
             raise
         except Exception as e:
-            # Ensure temporary file is cleaned up even if processing fails
-            if os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.info(f"Cleaned up temporary file after unexpected error: {temp_file_path}")
-                except:
-                    logger.warning(f"Failed to clean up temporary file: {temp_file_path}")
-            
             logger.error(f"An unexpected error occurred during document analysis: {e}", exc_info=True)
             raise DocumentProcessingError(f"An unexpected server error occurred: {e}")
+        finally:
+            # Always remove the temporary file, whatever the outcome
+            try:
+                os.unlink(temp_file_path)
+                logger.info(f"Removed temporary file: {temp_file_path}")
+            except FileNotFoundError:
+                pass
 
 class DocumentDetail(Resource):
     """
@@ -151,8 +134,9 @@ class DocumentActions(Resource):
         deadline = request.args.get('deadline')
         priority = request.args.get('priority')
 
-        # First, check if the document exists
-        if document_id not in self.document_processor.processed_documents:
+        # First, check if the document exists; the result is reused below instead of looked up again
+        doc_result = self.document_processor.get_document_result(document_id)
+        if doc_result is None:
             logger.warning(f"Document ID not found for actions request: {document_id}")
             raise DocumentNotFoundError(document_id=document_id)
 
@@ -160,12 +144,13 @@ class DocumentActions(Resource):
             document_id=document_id,
             status=status,
             deadline=deadline,
-            priority=priority
+            priority=priority,
+            doc_result=doc_result
         )
         
-        # Validate each item using Pydantic model
+        # Validate all items at once using the Pydantic adapter
         try:
-            validated_items = [ActionableItem(**item).dict() for item in actionable_items]
+            validated_items = _ACTIONABLE_ITEMS_ADAPTER.dump_python(_ACTIONABLE_ITEMS_ADAPTER.validate_python(actionable_items))
         except ValidationError as e:
             logger.error(f"Validation error for actionable items for doc {document_id}: {e.errors()}", exc_info=True)
             raise DocumentProcessingError(f"Failed to validate actionable items: {e}")
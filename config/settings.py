@@ -1,4 +1,5 @@
 import os
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,16 +16,26 @@ DOC_INPUT_DIR = os.path.join(BASE_DIR, "documents_to_process") # You'll need to
 DOC_OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 LOG_FILE_PATH = os.path.join(BASE_DIR, "app.log")
 CACHE_DIR = os.path.join(BASE_DIR, ".cache") # Directory for caching LLM responses
+DOCUMENT_STORE_DIR = os.path.join(BASE_DIR, ".document_store") # Processed documents evicted from memory
 
 # --- LLM Settings ---
 LLM_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")  # Default to gemini-1.5-flash if not set
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
 LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1024"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Max in-flight Gemini requests when processing asynchronously
+LLM_BATCH_MAX_DOCUMENTS = int(os.getenv("LLM_BATCH_MAX_DOCUMENTS", "8"))  # Max short documents analyzed in one Gemini request
+LLM_RETRIES = max(1, int(os.getenv("LLM_RETRIES", "3")))  # Attempts per Gemini request
+LLM_REQUEST_DEADLINE_SECONDS = float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "60"))  # No retries start after this
 
 # --- Caching Settings ---
 CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ["true", "1", "yes", "on"]
 CACHE_EXPIRATION_TIME_SECONDS = int(os.getenv("CACHE_EXPIRATION_TIME_SECONDS", "3600"))  # Default 1 hour
 
+# --- Document Store Settings ---
+DOCUMENT_STORE_MAX_IN_MEMORY = int(os.getenv("DOCUMENT_STORE_MAX_IN_MEMORY", "1024"))  # Older results are spilled to disk
+DOCUMENT_STORE_EXPIRATION_SECONDS = int(os.getenv("DOCUMENT_STORE_EXPIRATION_SECONDS", "604800"))  # Spilled results are deleted after this (default 7 days)
+COMPRESS_MEMORY_STORE = os.getenv("COMPRESS_MEMORY_STORE", "false").lower() in ["true", "1", "yes", "on"]  # Keep in-memory results zlib-compressed
+
 # --- Document Specific Settings (example, expand as needed) ---
 # Define expected metadata fields per document type
 DOCUMENT_TYPES = {
@@ -69,4 +80,24 @@ DOCUMENT_TYPES = {
             "document_purpose": "The primary purpose or intended use of the document."
         }
     }
-} 
\ No newline at end of file
+}
+
+def _freeze(value):
+    """Recursively converts dicts to read-only mappings and lists to tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+# The registry is constant at runtime: freeze it once so it can be shared safely
+# across threads and never mutated by callers
+DOCUMENT_TYPES = _freeze(DOCUMENT_TYPES)
+
+# Per-type lookups derived from the registry, so callers don't re-walk it on every document
+METADATA_FIELDS_BY_TYPE = MappingProxyType({
+    doc_type: config.get("metadata_fields", ()) for doc_type, config in DOCUMENT_TYPES.items()
+})
+SEMANTIC_DESCRIPTIONS_BY_TYPE = MappingProxyType({
+    doc_type: config.get("semantic_description", MappingProxyType({})) for doc_type, config in DOCUMENT_TYPES.items()
+})
\ No newline at end of file
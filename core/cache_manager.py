@@ -1,33 +1,118 @@
 import os
-import json
 import hashlib
+import struct
+import threading
 import time
-from typing import Any, Dict, Optional
+import orjson
+from typing import Any, Dict, Optional, Union
 from config.settings import CACHE_DIR, CACHE_EXPIRATION_TIME_SECONDS, CACHE_ENABLED
 from utils.logger import setup_logging
 
 logger = setup_logging(__name__)
 
+# Entry layout: 8-byte little-endian float timestamp followed by the raw UTF-8 value
+_TIMESTAMP_HEADER = struct.Struct("<d")
+
+def _serialize_schema(schema: Dict[str, Any]) -> bytes:
+    """Serializes a schema to canonical JSON bytes for hashing."""
+    return orjson.dumps(schema, option=orjson.OPT_SORT_KEYS) # Ensure consistent hashing
+
+# Serializes replacing an entry with checking and removing it, so pruning never deletes a fresh entry.
+# Module-level because every CacheManager shares CACHE_DIR.
+_entry_lock = threading.Lock()
+
+def _reset_entry_lock():
+    """Replaces the entry lock in a forked child, where a lock held by the parent's pruner would never be released."""
+    global _entry_lock
+    _entry_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_entry_lock) # gunicorn's preload_app forks while pruning may be running
+
+def hash_text(text: str) -> str:
+    """Returns the SHA-256 hex digest of a text, used to address cached LLM responses by content."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def prune_expired_files(directory: str, max_age_seconds: float, lock: Optional[threading.Lock] = None) -> int:
+    """
+    Removes the files in a directory that were last modified more than `max_age_seconds` ago,
+    and returns how many were removed. Files are never opened, only stat'ed.
+    `lock` (the cache's entry lock by default) is held only while each file is checked and removed,
+    so writers are never blocked for the whole directory walk.
+    """
+    removed = 0
+    oldest_kept = time.time() - max_age_seconds
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return 0
+    with entries:
+        for entry in entries:
+            try:
+                with lock or _entry_lock:
+                    if entry.is_file() and entry.stat().st_mtime < oldest_kept:
+                        os.remove(entry.path)
+                        removed += 1
+                        logger.debug(f"Removed expired file: {entry.path}")
+            except FileNotFoundError:
+                continue # Removed concurrently
+            except OSError as e:
+                logger.error(f"Unexpected error while pruning {entry.path}: {e}")
+    return removed
+
 class CacheManager:
     """
     Manages a simple file-based cache for LLM responses.
-    Cache keys are generated from the prompt and schema.
+    Cache keys are generated from the prompt and schema, or, for content-addressed
+    entries, from the document text hash, prompt version, and schema.
+    Each entry is stored as a timestamp header followed by the raw response text.
     """
     def __init__(self):
+        self._schema_blobs: Dict[str, bytes] = {} # Serialized schemas memoized by schema key
+        self._path_prefix = os.path.join(CACHE_DIR, '') # CACHE_DIR with trailing separator, joined once
         if CACHE_ENABLED:
             os.makedirs(CACHE_DIR, exist_ok=True)
-            self._prune_old_cache_files() # Clean up old files on init
+            # Clean up old files in the background so startup doesn't wait on a directory walk
+            threading.Thread(target=self._prune_old_cache_files, name="cache-pruner", daemon=True).start()
 
-    def generate_cache_key(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
-        """Generates a unique cache key based on prompt and schema."""
-        data_to_hash = prompt
+    def generate_cache_key(self, prompt: Union[str, bytes], schema: Optional[Dict[str, Any]] = None, schema_key: Optional[str] = None) -> str:
+        """
+        Generates a unique cache key based on prompt and schema.
+        The prompt may be given as str or as already UTF-8 encoded bytes.
+        When a schema_key is given, the serialized schema is memoized under it
+        so fixed schemas are only serialized once.
+        """
+        # Feed prompt and schema separately so no concatenated copy of the prompt is built
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(prompt if isinstance(prompt, (bytes, bytearray, memoryview)) else prompt.encode('utf-8'))
         if schema:
-            data_to_hash += json.dumps(schema, sort_keys=True) # Ensure consistent hashing
-        return hashlib.md5(data_to_hash.encode('utf-8')).hexdigest()
+            hasher.update(self._schema_blob(schema, schema_key))
+        return hasher.hexdigest()
+
+    def generate_content_key(self, text_hash: str, prompt_version: str, schema: Optional[Dict[str, Any]] = None,
+                             schema_key: Optional[str] = None, variant: str = "") -> str:
+        """
+        Generates a content-addressed cache key from the document text hash, the version of
+        the prompt template, the response schema, and any other prompt inputs (`variant`).
+        Rewording a prompt without bumping its version keeps hitting existing entries.
+        """
+        hasher = hashlib.sha256(f"{prompt_version}|{variant}|{text_hash}|".encode('utf-8'))
+        if schema:
+            hasher.update(self._schema_blob(schema, schema_key))
+        return hasher.hexdigest()
+
+    def _schema_blob(self, schema: Dict[str, Any], schema_key: Optional[str] = None) -> bytes:
+        """Returns the serialized schema, reusing the memoized bytes for known schema keys."""
+        if schema_key is None:
+            return _serialize_schema(schema)
+        blob = self._schema_blobs.get(schema_key)
+        if blob is None:
+            blob = self._schema_blobs[schema_key] = _serialize_schema(schema)
+        return blob
 
     def _get_cache_file_path(self, key: str) -> str:
         """Returns the full path for a cache file."""
-        return os.path.join(CACHE_DIR, f"{key}.json")
+        return f"{self._path_prefix}{key}.cache"
 
     def set(self, key: str, value: str):
         """
@@ -38,16 +123,19 @@ class CacheManager:
             return
 
         file_path = self._get_cache_file_path(key)
-        cache_entry = {
-            "timestamp": time.time(),
-            "value": value
-        }
+        # Write to a per-writer temp file and atomically swap it in, so concurrent
+        # readers (possibly in other worker processes) never see a half-written entry
+        tmp_path = f"{file_path}.tmp.{os.getpid()}.{threading.get_ident()}"
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_entry, f, ensure_ascii=False, indent=2)
+            with open(tmp_path, 'wb') as f:
+                f.write(_TIMESTAMP_HEADER.pack(time.time()))
+                f.write(value.encode('utf-8'))
+            with _entry_lock:
+                os.replace(tmp_path, file_path)
             logger.debug(f"Cached response for key: {key}")
         except IOError as e:
             logger.error(f"Failed to write to cache file {file_path}: {e}")
+            self._remove_file(tmp_path)
 
     def get(self, key: str) -> Optional[str]:
         """
@@ -58,60 +146,56 @@ class CacheManager:
             return None
 
         file_path = self._get_cache_file_path(key)
-        if not os.path.exists(file_path):
+        try:
+            # Open directly instead of checking existence first; a miss costs a single failed open
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except IOError as e:
+            logger.error(f"Failed to read cache file {file_path}: {e}. Deleting.")
+            self._remove_file(file_path)
+            return None
+
+        if len(data) < _TIMESTAMP_HEADER.size:
+            logger.warning(f"Malformed cache entry for key: {key}. Deleting.")
+            self._remove_file(file_path)
+            return None
+
+        (timestamp,) = _TIMESTAMP_HEADER.unpack_from(data)
+        if (time.time() - timestamp) > CACHE_EXPIRATION_TIME_SECONDS:
+            logger.info(f"Cache entry for key {key} expired. Deleting.")
+            self._remove_file(file_path)
             return None
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                cache_entry = json.load(f)
-
-            timestamp = cache_entry.get("timestamp")
-            value = cache_entry.get("value")
-
-            if timestamp is None or value is None:
-                logger.warning(f"Malformed cache entry for key: {key}. Deleting.")
-                os.remove(file_path)
-                return None
-
-            if (time.time() - timestamp) > CACHE_EXPIRATION_TIME_SECONDS:
-                logger.info(f"Cache entry for key {key} expired. Deleting.")
-                os.remove(file_path)
-                return None
-
-            logger.debug(f"Retrieved from cache for key: {key}")
-            return value
-        except (IOError, json.JSONDecodeError) as e:
-            logger.error(f"Failed to read or parse cache file {file_path}: {e}. Deleting.")
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            value = data[_TIMESTAMP_HEADER.size:].decode('utf-8')
+        except UnicodeDecodeError:
+            logger.warning(f"Malformed cache entry for key: {key}. Deleting.")
+            self._remove_file(file_path)
             return None
 
+        logger.debug(f"Retrieved from cache for key: {key}")
+        return value
+
+    def _remove_file(self, file_path: str):
+        """Removes a cache file, ignoring files that are already gone."""
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
     def _prune_old_cache_files(self):
-        """Removes expired cache files from the cache directory."""
+        """
+        Removes expired cache files from the cache directory.
+        Expiry is judged by file modification time (refreshed on every `set`),
+        so entry bodies are never opened or parsed during pruning.
+        """
         if not CACHE_ENABLED:
             return
-        
+
         logger.info(f"Pruning old cache files in {CACHE_DIR}...")
-        current_time = time.time()
-        for filename in os.listdir(CACHE_DIR):
-            file_path = os.path.join(CACHE_DIR, filename)
-            if not os.path.isfile(file_path):
-                continue
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    cache_entry = json.load(f)
-                timestamp = cache_entry.get("timestamp")
-                
-                if timestamp is None or (current_time - timestamp) > CACHE_EXPIRATION_TIME_SECONDS:
-                    os.remove(file_path)
-                    logger.debug(f"Removed expired cache file: {filename}")
-            except (IOError, json.JSONDecodeError) as e:
-                logger.warning(f"Could not read or parse cache file {filename} during pruning: {e}. Removing.")
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as e:
-                logger.error(f"Unexpected error during cache pruning for {filename}: {e}")
+        prune_expired_files(CACHE_DIR, CACHE_EXPIRATION_TIME_SECONDS)
 
     def clear_cache(self):
         """Clears the entire cache."""
@@ -122,8 +206,9 @@ class CacheManager:
         for filename in os.listdir(CACHE_DIR):
             file_path = os.path.join(CACHE_DIR, filename)
             try:
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
+                with _entry_lock:
+                    if os.path.isfile(file_path):
+                        os.remove(file_path)
             except Exception as e:
                 logger.error(f"Error deleting cache file {file_path}: {e}")
         logger.info("Cache cleared.") 
\ No newline at end of file
@@ -1,16 +1,83 @@
 import os
+import asyncio
+import functools
 import pypdf
-import json
-import uuid
-from typing import Dict, Any, List, Optional
-from config.settings import DOCUMENT_TYPES
-from core.llm_interface import LLMInterface
-from core.models import DocumentResult, DocumentClassification, DocumentMetadata, ActionableItem
+import orjson
+from concurrent.futures import Executor
+from typing import Dict, Any, List, Optional, Tuple
+from config.settings import DOCUMENT_TYPES, METADATA_FIELDS_BY_TYPE, SEMANTIC_DESCRIPTIONS_BY_TYPE, LLM_BATCH_MAX_DOCUMENTS
+from core.llm_interface import LLMInterface, MAX_PROMPT_TEXT_CHARS, BATCH_DOCUMENT_MAX_CHARS
+from core.cache_manager import hash_text
+from core.document_store import DocumentStore
+from core.heuristic_classifier import heuristic_classify
+from core.models import DocumentResult, DocumentClassification, DocumentMetadata, ActionableItem, generate_id
 from utils.logger import setup_logging
 from utils.exceptions import DocumentProcessingError, LLMAPIError, InvalidInputError
 
 logger = setup_logging(__name__)
 
+# Values used by generated actionable items, for rejecting filters that can never match
+ACTION_STATUSES = frozenset({"pending", "completed"})
+ACTION_PRIORITIES = frozenset({"low", "medium", "high"})
+
+# Column order of compact batch output files
+BATCH_METADATA_FIELDS = tuple(DocumentResult.model_fields)
+
+def _flatten_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Maps each metadata field to its plain value, unwrapping {"value": ...} entries."""
+    return {field: (value.get("value") if isinstance(value, dict) else value) for field, value in metadata.items()}
+
+PDF_TEXT_CACHE_SIZE = 64 # Extracted text heads kept for files processed again unchanged
+
+def _extract_pdf_head(pdf_path: str) -> str:
+    """Parses a PDF and returns the first MAX_PROMPT_TEXT_CHARS characters of its text."""
+    parts: List[str] = []
+    extracted_chars = 0
+    with open(pdf_path, 'rb') as f:
+        reader = pypdf.PdfReader(f)
+        for page in reader.pages:
+            page_text = page.extract_text() or ""
+            parts.append(page_text)
+            extracted_chars += len(page_text)
+            # Prompts never include more than the head of the text, so later pages are not needed
+            if extracted_chars >= MAX_PROMPT_TEXT_CHARS:
+                break
+    return "".join(parts)[:MAX_PROMPT_TEXT_CHARS]
+
+@functools.lru_cache(maxsize=PDF_TEXT_CACHE_SIZE)
+def _extract_pdf_head_cached(pdf_path: str, mtime_ns: int, size: int) -> str:
+    """Cached `_extract_pdf_head`; the modification time and size in the key invalidate edited files."""
+    return _extract_pdf_head(pdf_path)
+
+def _read_pdf_head(pdf_path: str) -> str:
+    """Returns the head of a PDF's text, parsing the file only if it changed since it was last read."""
+    try:
+        stat = os.stat(pdf_path)
+    except OSError:
+        return _extract_pdf_head(pdf_path) # Let opening the file report the problem
+    return _extract_pdf_head_cached(pdf_path, stat.st_mtime_ns, stat.st_size)
+
+def extract_pdf_text(pdf_path: str) -> str:
+    """
+    Extracts the head of a PDF's text content: the first MAX_PROMPT_TEXT_CHARS characters,
+    the most any prompt uses. Pages after the one that reaches that length are not parsed.
+    Trimming here means the prompt builders' own slices return the string itself instead of copying it.
+    Re-processing an unchanged file reuses the text extracted last time.
+    A plain function, so it can also be run in a worker process.
+    """
+    try:
+        text = _read_pdf_head(pdf_path)
+        if not text.strip():
+            raise DocumentProcessingError(f"Could not extract any text from PDF: {os.path.basename(pdf_path)}")
+        logger.info(f"Successfully extracted text from {os.path.basename(pdf_path)}")
+        return text
+    except FileNotFoundError:
+        raise DocumentProcessingError(f"PDF file not found: {pdf_path}")
+    except pypdf.errors.PdfReadError as e:
+        raise DocumentProcessingError(f"Failed to read PDF file {os.path.basename(pdf_path)}: {e}")
+    except Exception as e:
+        raise DocumentProcessingError(f"An unexpected error occurred during text extraction from {os.path.basename(pdf_path)}: {e}", details={"file_path": pdf_path})
+
 class DocumentProcessor:
     """
     Facade class for processing documents, orchestrating PDF extraction,
@@ -18,79 +85,76 @@ class DocumentProcessor:
     """
     def __init__(self):
         self.llm_interface = LLMInterface()
-        self.processed_documents: Dict[str, DocumentResult] = {} # In-memory storage for processed documents
+        self.cache_manager = self.llm_interface.cache_manager # Shared with the LLM layer; also caches whole-document analyses
+        self.processed_documents = DocumentStore() # Processed documents: recent ones in memory, older ones on disk
 
     def _extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extracts text content from a PDF file."""
-        text = ""
-        try:
-            with open(pdf_path, 'rb') as f:
-                reader = pypdf.PdfReader(f)
-                for page_num in range(len(reader.pages)):
-                    page = reader.pages[page_num]
-                    text += page.extract_text() or ""
-            if not text.strip():
-                raise DocumentProcessingError(f"Could not extract any text from PDF: {os.path.basename(pdf_path)}")
-            logger.info(f"Successfully extracted text from {os.path.basename(pdf_path)}")
-            return text
-        except FileNotFoundError:
-            raise DocumentProcessingError(f"PDF file not found: {pdf_path}")
-        except pypdf.errors.PdfReadError as e:
-            raise DocumentProcessingError(f"Failed to read PDF file {os.path.basename(pdf_path)}: {e}")
-        except Exception as e:
-            raise DocumentProcessingError(f"An unexpected error occurred during text extraction from {os.path.basename(pdf_path)}: {e}", details={"file_path": pdf_path})
+        """Extracts the head of a PDF's text content; see `extract_pdf_text`."""
+        return extract_pdf_text(pdf_path)
 
-    def process_document(self, file_path: str) -> Dict[str, Any]:
-        """
-        Processes a single document: extracts text, classifies, and extracts metadata.
-        Returns the structured document result as a dictionary.
-        """
-        filename = os.path.basename(file_path)
-        document_id = str(uuid.uuid4())
-        text_content = ""
-        classification_data = None
-        extracted_metadata = {}
-        processing_status = "success"
-        error_message = None
+    def _analysis_cache_key(self, content_hash: str) -> str:
+        """Returns the cache key under which the analysis of a file's content is stored."""
+        return f"doc_{content_hash}"
 
+    def _get_cached_analysis(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached classification and metadata for identical file content, if any."""
+        cached = self.cache_manager.get(self._analysis_cache_key(content_hash))
+        if not cached:
+            return None
         try:
-            text_content = self._extract_text_from_pdf(file_path)
+            analysis = orjson.loads(cached)
+            return {
+                "classification": DocumentClassification(**analysis["classification"]),
+                "metadata": analysis["metadata"]
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed cached analysis for content hash {content_hash}: {e}")
+            return None
 
-            # 1. Document Type Classification
-            classification_data = self.llm_interface.classify_document(text_content, DOCUMENT_TYPES)
-            doc_type = classification_data.get("type")
-            classification_confidence = classification_data.get("confidence")
+    def _cache_analysis(self, content_hash: str, doc_result: DocumentResult):
+        """Caches the classification and metadata of a successfully processed document."""
+        analysis = {
+            "classification": doc_result.classification.dict(),
+            "metadata": doc_result.metadata
+        }
+        self.cache_manager.set(self._analysis_cache_key(content_hash), orjson.dumps(analysis).decode("utf-8"))
 
-            # Get metadata fields for the classified document type
-            fields_to_extract = DOCUMENT_TYPES.get(doc_type, {}).get("metadata_fields", [])
+    def _store_result(self, doc_result: DocumentResult) -> Dict[str, Any]:
+        """Stores a processed document in memory and returns it as a dictionary."""
+        self.processed_documents[doc_result.document_id] = doc_result
+        return doc_result.to_dict() # Return as dictionary for API consistency
 
-            # 2. Semantic Metadata Extraction (if fields are defined)
-            if fields_to_extract:
-                if doc_type == "other":
-                    # Use dynamic metadata extraction for "other" documents
-                    extracted_metadata = self.llm_interface.extract_dynamic_metadata_for_other(text_content)
-                else:
-                    # Use standard metadata extraction for specific document types
-                    extracted_metadata = self.llm_interface.extract_metadata(text_content, doc_type, fields_to_extract)
-                # Filter out None values for cleaner output if preferred, or keep them for explicit missing fields
-                # extracted_metadata = {k: v for k, v in extracted_metadata.items() if v is not None}
-            else:
-                logger.info(f"No specific metadata fields defined for document type: {doc_type}. Skipping metadata extraction.")
-                extracted_metadata = {}
-
-
-        except DocumentProcessingError as e:
-            processing_status = "failed"
-            error_message = str(e)
-            logger.error(f"Document processing failed for {filename}: {e}")
-        except LLMAPIError as e:
-            processing_status = "failed"
-            error_message = f"LLM API error during processing: {e.message}"
-            logger.error(f"LLM API error for {filename}: {e.message}", exc_info=True)
-        except Exception as e:
-            processing_status = "failed"
-            error_message = f"An unexpected error occurred: {e}"
-            logger.error(f"Unexpected error for {filename}: {e}", exc_info=True)
+    def _reuse_cached_analysis(self, document_id: str, filename: str, content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stores and returns a result built from the cached analysis of identical content, if any."""
+        if not content_hash:
+            return None
+        cached_analysis = self._get_cached_analysis(content_hash)
+        if not cached_analysis:
+            return None
+        logger.info(f"Reusing cached analysis for {filename} (content hash {content_hash}).")
+        return self._store_result(DocumentResult(
+            document_id=document_id,
+            filename=filename,
+            classification=cached_analysis["classification"],
+            metadata=cached_analysis["metadata"]
+        ))
+
+    def _processing_error_message(self, filename: str, error: Exception) -> str:
+        """Logs a processing failure and returns the error message reported in the result."""
+        if isinstance(error, DocumentProcessingError):
+            logger.error(f"Document processing failed for {filename}: {error}")
+            return str(error)
+        if isinstance(error, LLMAPIError):
+            logger.error(f"LLM API error for {filename}: {error.message}", exc_info=True)
+            return f"LLM API error during processing: {error.message}"
+        logger.error(f"Unexpected error for {filename}: {error}", exc_info=True)
+        return f"An unexpected error occurred: {error}"
+
+    def _finalize_result(self, document_id: str, filename: str, classification_data: Optional[Dict[str, Any]],
+                         extracted_metadata: Dict[str, Any], error_message: Optional[str],
+                         content_hash: Optional[str]) -> Dict[str, Any]:
+        """Builds the DocumentResult, caches successful analyses, and stores the result."""
+        processing_status = "failed" if error_message else "success"
 
         # Construct DocumentResult model
         doc_result = DocumentResult(
@@ -105,17 +169,230 @@ class DocumentProcessor:
             error_message=error_message
         )
 
+        # Only complete analyses are worth reusing for identical uploads
+        if content_hash and processing_status == "success":
+            self._cache_analysis(content_hash, doc_result)
+
         # Store in-memory
-        self.processed_documents[document_id] = doc_result
-        return doc_result.dict() # Return as dictionary for API consistency
+        return self._store_result(doc_result)
+
+    def process_document(self, file_path: str, filename: Optional[str] = None, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Processes a single document: extracts text, classifies, and extracts metadata.
+        Returns the structured document result as a dictionary.
+        `filename` overrides the name reported in the result (e.g. the original name of an upload).
+        `content_hash` identifies the file's bytes; when given, the analysis of identical content
+        is reused from the cache instead of re-running text extraction and the LLM calls.
+        """
+        filename = filename or os.path.basename(file_path)
+        document_id = generate_id()
+
+        cached_result = self._reuse_cached_analysis(document_id, filename, content_hash)
+        if cached_result:
+            return cached_result
+
+        try:
+            text_content = self._extract_text_from_pdf(file_path)
+        except Exception as e:
+            error_message = self._processing_error_message(filename, e)
+            return self._finalize_result(document_id, filename, None, {}, error_message, content_hash)
+
+        return self._analyze_text(document_id, filename, text_content, content_hash=content_hash)
+
+    def _analyze_text(self, document_id: str, filename: str, text_content: str, content_hash: Optional[str] = None,
+                      analysis: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
+                      classification: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Classifies extracted text and extracts its metadata, then stores the result.
+        `analysis` is an already obtained (classification, metadata) pair, e.g. from a batched call.
+        `classification` is an already obtained heuristic classification, so only metadata is extracted;
+        without either, the heuristic is tried first.
+        """
+        classification_data = None
+        extracted_metadata = {}
+        error_message = None
+
+        try:
+            text_hash = hash_text(text_content) # Addresses cached LLM responses for this text
+
+            # 1. Document Type Classification and Semantic Metadata Extraction
+            if analysis is None:
+                classification_data = classification or heuristic_classify(text_content)
+                if classification_data:
+                    # Unambiguous documents only need their metadata extracted
+                    doc_type = classification_data["type"]
+                    analysis = (classification_data, self.llm_interface.extract_metadata(
+                        text_content, doc_type, METADATA_FIELDS_BY_TYPE[doc_type], text_hash=text_hash))
+                else:
+                    # Otherwise classify and extract in one LLM call
+                    analysis = self.llm_interface.classify_and_extract(text_content, DOCUMENT_TYPES, text_hash=text_hash)
+            classification_data, extracted_metadata = analysis
+
+            # 2. "other" documents get dynamic metadata extraction, which needs its own calls
+            if classification_data.get("type") == "other":
+                extracted_metadata = self.llm_interface.extract_dynamic_metadata_for_other(text_content, text_hash=text_hash)
+        except Exception as e:
+            error_message = self._processing_error_message(filename, e)
+
+        return self._finalize_result(document_id, filename, classification_data, extracted_metadata, error_message, content_hash)
+
+    async def _aanalyze_text(self, document_id: str, filename: str, text_content: str, content_hash: Optional[str] = None,
+                             analysis: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None,
+                             classification: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Coroutine counterpart of `_analyze_text`."""
+        classification_data = None
+        extracted_metadata = {}
+        error_message = None
+
+        try:
+            text_hash = hash_text(text_content)
+            if analysis is None:
+                classification_data = classification or heuristic_classify(text_content)
+                if classification_data:
+                    doc_type = classification_data["type"]
+                    analysis = (classification_data, await self.llm_interface.aextract_metadata(
+                        text_content, doc_type, METADATA_FIELDS_BY_TYPE[doc_type], text_hash=text_hash))
+                else:
+                    analysis = await self.llm_interface.aclassify_and_extract(text_content, DOCUMENT_TYPES, text_hash=text_hash)
+            classification_data, extracted_metadata = analysis
+            if classification_data.get("type") == "other":
+                extracted_metadata = await self.llm_interface.aextract_dynamic_metadata_for_other(text_content, text_hash=text_hash)
+        except Exception as e:
+            error_message = self._processing_error_message(filename, e)
+
+        return self._finalize_result(document_id, filename, classification_data, extracted_metadata, error_message, content_hash)
+
+    def _plan_batches(self, documents: List[Tuple[int, str, str]]) -> Tuple[List[Tuple[int, str, str, Optional[Dict[str, Any]]]], List[List[Tuple[int, str, str]]]]:
+        """
+        Splits extracted (position, filename, text) documents into those analyzed on their own and
+        groups of short ones that share a batched LLM call.
+        Long documents and short ones the heuristic classifies (returned with that classification)
+        are analyzed on their own; the remaining short documents are grouped, up to LLM_BATCH_MAX_DOCUMENTS each.
+        """
+        individual: List[Tuple[int, str, str, Optional[Dict[str, Any]]]] = []
+        short_documents: List[Tuple[int, str, str]] = []
+        for position, filename, text_content in documents:
+            classification = heuristic_classify(text_content) if len(text_content) <= BATCH_DOCUMENT_MAX_CHARS else None
+            if classification or len(text_content) > BATCH_DOCUMENT_MAX_CHARS:
+                individual.append((position, filename, text_content, classification))
+            else:
+                short_documents.append((position, filename, text_content))
+        groups = [short_documents[start:start + LLM_BATCH_MAX_DOCUMENTS] for start in range(0, len(short_documents), LLM_BATCH_MAX_DOCUMENTS)]
+        return individual, groups
+
+    def process_documents(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Processes several documents and returns their results in input order.
+        Short documents (up to BATCH_DOCUMENT_MAX_CHARS of text) that the heuristic cannot classify are
+        analyzed together, up to LLM_BATCH_MAX_DOCUMENTS per LLM call; the others are analyzed individually.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_paths)
+        documents: List[Tuple[int, str, str]] = [] # (position, filename, text)
+
+        for position, file_path in enumerate(file_paths):
+            filename = os.path.basename(file_path)
+            try:
+                documents.append((position, filename, self._extract_text_from_pdf(file_path)))
+            except Exception as e:
+                error_message = self._processing_error_message(filename, e)
+                results[position] = self._finalize_result(generate_id(), filename, None, {}, error_message, None)
+
+        individual, groups = self._plan_batches(documents)
+        for position, filename, text_content, classification in individual:
+            results[position] = self._analyze_text(generate_id(), filename, text_content, classification=classification)
+
+        for group in groups:
+            analyses: List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]] = [None] * len(group)
+            try:
+                analyses = self.llm_interface.classify_and_extract_batch([text for _, _, text in group], DOCUMENT_TYPES)
+            except LLMAPIError as e:
+                logger.warning(f"Batched analysis of {len(group)} documents failed, analyzing them individually: {e.message}")
+            for (position, filename, text_content), analysis in zip(group, analyses):
+                results[position] = self._analyze_text(generate_id(), filename, text_content, analysis=analysis)
+
+        return results
+
+    async def _aextract_text(self, file_path: str, extraction_executor: Optional[Executor] = None) -> str:
+        """Extracts a PDF's text in a worker thread, or in `extraction_executor` when one is given."""
+        if extraction_executor is None:
+            return await asyncio.to_thread(self._extract_text_from_pdf, file_path)
+        return await asyncio.get_running_loop().run_in_executor(extraction_executor, extract_pdf_text, file_path)
+
+    async def aprocess_document(self, file_path: str, filename: Optional[str] = None, content_hash: Optional[str] = None,
+                                extraction_executor: Optional[Executor] = None) -> Dict[str, Any]:
+        """
+        Coroutine counterpart of `process_document`.
+        PDF text extraction runs in a worker thread and the LLM calls are awaited, so many
+        documents can be processed concurrently on one event loop.
+        With an `extraction_executor` (e.g. a ProcessPoolExecutor), extraction runs there instead,
+        so parsing several PDFs is not serialized by the GIL.
+        """
+        filename = filename or os.path.basename(file_path)
+        document_id = generate_id()
+
+        cached_result = self._reuse_cached_analysis(document_id, filename, content_hash)
+        if cached_result:
+            return cached_result
+
+        try:
+            text_content = await self._aextract_text(file_path, extraction_executor)
+        except Exception as e:
+            error_message = self._processing_error_message(filename, e)
+            return self._finalize_result(document_id, filename, None, {}, error_message, content_hash)
+
+        return await self._aanalyze_text(document_id, filename, text_content, content_hash=content_hash)
+
+    async def aprocess_batch(self, file_paths: List[str], extraction_executor: Optional[Executor] = None) -> List[Dict[str, Any]]:
+        """
+        Concurrent counterpart of `process_documents`: returns the results in input order.
+        Texts are extracted concurrently (in `extraction_executor`, if given); short documents the heuristic
+        cannot classify share batched LLM calls, and all LLM calls run concurrently, bounded by LLM_MAX_CONCURRENCY.
+        """
+        texts = await asyncio.gather(*(self._aextract_text(file_path, extraction_executor) for file_path in file_paths),
+                                     return_exceptions=True)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_paths)
+        documents: List[Tuple[int, str, str]] = []
+        for position, (file_path, text_content) in enumerate(zip(file_paths, texts)):
+            filename = os.path.basename(file_path)
+            if isinstance(text_content, Exception):
+                error_message = self._processing_error_message(filename, text_content)
+                results[position] = self._finalize_result(generate_id(), filename, None, {}, error_message, None)
+            else:
+                documents.append((position, filename, text_content))
+
+        async def analyze(position: int, filename: str, text_content: str, **kwargs):
+            results[position] = await self._aanalyze_text(generate_id(), filename, text_content, **kwargs)
+
+        async def analyze_group(group: List[Tuple[int, str, str]]):
+            analyses: List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]] = [None] * len(group)
+            try:
+                analyses = await self.llm_interface.aclassify_and_extract_batch([text for _, _, text in group], DOCUMENT_TYPES)
+            except LLMAPIError as e:
+                logger.warning(f"Batched analysis of {len(group)} documents failed, analyzing them individually: {e.message}")
+            await asyncio.gather(*(
+                analyze(position, filename, text_content, analysis=analysis)
+                for (position, filename, text_content), analysis in zip(group, analyses)
+            ))
+
+        individual, groups = self._plan_batches(documents)
+        await asyncio.gather(
+            *(analyze(position, filename, text_content, classification=classification)
+              for position, filename, text_content, classification in individual),
+            *(analyze_group(group) for group in groups)
+        )
+        return results
+
+    def get_document_result(self, document_id: str) -> Optional[DocumentResult]:
+        """Returns the stored DocumentResult for an ID, or None if it was never processed."""
+        return self.processed_documents.get(document_id)
 
     def get_document_metadata(self, document_id: str) -> Optional[Dict[str, Any]]:
         """Retrieves processed document metadata by ID."""
-        doc_result = self.processed_documents.get(document_id)
+        doc_result = self.get_document_result(document_id)
         if doc_result:
             # Add semantic descriptions to the metadata fields for AI agents
             doc_type = doc_result.classification.type
-            semantic_descriptions = DOCUMENT_TYPES.get(doc_type, {}).get("semantic_description", {})
+            semantic_descriptions = SEMANTIC_DESCRIPTIONS_BY_TYPE.get(doc_type, {})
             
             # Create a copy of metadata to add descriptions
             metadata_with_descriptions = {}
@@ -125,22 +402,32 @@ class DocumentProcessor:
                     "description": semantic_descriptions.get(field, "No specific semantic description available for this field.")
                 }
             
-            # Create a new dict for the response to include descriptions
-            response_data = doc_result.dict()
-            response_data["metadata"] = metadata_with_descriptions
-            return response_data
+            # Create a new dict for the response to include descriptions, reusing the serialized result
+            return {**doc_result.to_dict(), "metadata": metadata_with_descriptions}
         return None
 
-    def get_actionable_items(self, document_id: str, status: Optional[str] = None, deadline: Optional[str] = None, priority: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_actionable_items(self, document_id: str, status: Optional[str] = None, deadline: Optional[str] = None, priority: Optional[str] = None, doc_result: Optional[DocumentResult] = None) -> List[Dict[str, Any]]:
         """
         Extracts and filters actionable items from a processed document.
         This is a simplified example; a real implementation would use LLM for extraction.
+        Callers that already looked up the document can pass it as `doc_result` to skip a second lookup.
         """
-        doc_result = self.processed_documents.get(document_id)
+        if doc_result is None:
+            doc_result = self.get_document_result(document_id)
         if not doc_result:
             return [] # Or raise DocumentNotFoundError
 
+        # Nothing can match: failed or empty analyses yield no actions, and
+        # every generated action uses one of the known statuses and priorities
+        if doc_result.processing_status != "success" or not doc_result.metadata:
+            return []
+        if (status and status not in ACTION_STATUSES) or (priority and priority not in ACTION_PRIORITIES):
+            return []
+
         actions: List[ActionableItem] = []
+
+        doc_type = doc_result.classification.type
+        flat_metadata = _flatten_metadata(doc_result.metadata)
         
         # --- Simplified Actionable Item Generation (Placeholder) ---
         # In a real system, you would call the LLM to identify actionable items
@@ -148,10 +435,10 @@ class DocumentProcessor:
         # Example: LLM prompt: "Identify any actionable items, deadlines, or tasks from this document."
 
         # For demonstration, let's create some dummy actions based on invoice/contract examples
-        if doc_result.classification.type == "invoice":
-            amount = doc_result.metadata.get("amount", {}).get("value") if isinstance(doc_result.metadata.get("amount"), dict) else doc_result.metadata.get("amount")
-            due_date = doc_result.metadata.get("due_date", {}).get("value") if isinstance(doc_result.metadata.get("due_date"), dict) else doc_result.metadata.get("due_date")
-            vendor = doc_result.metadata.get("vendor", {}).get("value") if isinstance(doc_result.metadata.get("vendor"), dict) else doc_result.metadata.get("vendor")
+        if doc_type == "invoice":
+            amount = flat_metadata.get("amount")
+            due_date = flat_metadata.get("due_date")
+            vendor = flat_metadata.get("vendor")
 
             if amount and due_date:
                 actions.append(ActionableItem(
@@ -161,8 +448,8 @@ class DocumentProcessor:
                     priority="high",
                     source_field="amount, due_date"
                 ))
-            if doc_result.metadata.get("line_items"):
-                for item in doc_result.metadata["line_items"]:
+            if flat_metadata.get("line_items"):
+                for item in flat_metadata["line_items"]:
                     if isinstance(item, dict) and item.get("description"):
                         actions.append(ActionableItem(
                             description=f"Review line item: {item['description']}",
@@ -171,9 +458,9 @@ class DocumentProcessor:
                             source_field="line_items"
                         ))
 
-        elif doc_result.classification.type == "contract":
-            effective_date = doc_result.metadata.get("effective_date", {}).get("value") if isinstance(doc_result.metadata.get("effective_date"), dict) else doc_result.metadata.get("effective_date")
-            termination_date = doc_result.metadata.get("termination_date", {}).get("value") if isinstance(doc_result.metadata.get("termination_date"), dict) else doc_result.metadata.get("termination_date")
+        elif doc_type == "contract":
+            effective_date = flat_metadata.get("effective_date")
+            termination_date = flat_metadata.get("termination_date")
 
             if effective_date:
                 actions.append(ActionableItem(
@@ -191,8 +478,8 @@ class DocumentProcessor:
                     source_field="termination_date"
                 ))
             
-            if doc_result.metadata.get("key_terms"):
-                for term in doc_result.metadata["key_terms"]:
+            if flat_metadata.get("key_terms"):
+                for term in flat_metadata["key_terms"]:
                     if isinstance(term, str) and len(term) > 10: # Simple heuristic for a "meaningful" term
                          actions.append(ActionableItem(
                             description=f"Understand contract term: {term[:50]}...",
@@ -201,13 +488,13 @@ class DocumentProcessor:
                             source_field="key_terms"
                         ))
 
-        elif doc_result.classification.type == "other":
+        elif doc_type == "other":
             # Handle actionable items for generic "other" documents
-            document_title = doc_result.metadata.get("document_title", {}).get("value") if isinstance(doc_result.metadata.get("document_title"), dict) else doc_result.metadata.get("document_title")
-            author = doc_result.metadata.get("author", {}).get("value") if isinstance(doc_result.metadata.get("author"), dict) else doc_result.metadata.get("author")
-            subject = doc_result.metadata.get("subject", {}).get("value") if isinstance(doc_result.metadata.get("subject"), dict) else doc_result.metadata.get("subject")
-            key_points = doc_result.metadata.get("key_points", {}).get("value") if isinstance(doc_result.metadata.get("key_points"), dict) else doc_result.metadata.get("key_points")
-            document_purpose = doc_result.metadata.get("document_purpose", {}).get("value") if isinstance(doc_result.metadata.get("document_purpose"), dict) else doc_result.metadata.get("document_purpose")
+            document_title = flat_metadata.get("document_title")
+            author = flat_metadata.get("author")
+            subject = flat_metadata.get("subject")
+            key_points = flat_metadata.get("key_points")
+            document_purpose = flat_metadata.get("document_purpose")
 
             # Create a general review action for the document
             if document_title or subject:
@@ -255,28 +542,48 @@ class DocumentProcessor:
                     source_field="author"
                 ))
 
-        filtered_actions = []
-        for action in actions:
-            match = True
-            if status and action.status != status:
-                match = False
-            if deadline and action.deadline and action.deadline != deadline: # Basic string match, would need date parsing for real use
-                match = False
-            if priority and action.priority != priority:
-                match = False
-            
-            if match:
-                filtered_actions.append(action.dict())
+        filtered_actions = [
+            action.model_dump() for action in actions
+            if (not status or action.status == status)
+            and (not priority or action.priority == priority)
+            and not (deadline and action.deadline and action.deadline != deadline) # Basic string match, would need date parsing for real use
+        ]
         
         logger.info(f"Found {len(filtered_actions)} actionable items for document {document_id}.")
         return filtered_actions
 
+    def save_batch_metadata(self, results: List[Dict[str, Any]], output_path: str):
+        """
+        Saves the results of a batch to a single compact JSON file.
+        The field names are written once, as a "schema" header, followed by one row of values per result.
+        """
+        rows = [[result.get(field) for field in BATCH_METADATA_FIELDS] for result in results]
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps({"schema": BATCH_METADATA_FIELDS, "rows": rows}, option=orjson.OPT_NON_STR_KEYS))
+            logger.info(f"Metadata of {len(rows)} documents saved to {output_path}")
+        except IOError as e:
+            logger.error(f"Failed to save batch metadata to {output_path}: {e}")
+            raise DocumentProcessingError(f"Could not save batch metadata: {e}")
+
+    @staticmethod
+    def load_batch_metadata(input_path: str) -> List[Dict[str, Any]]:
+        """Reads a file written by `save_batch_metadata` back into one dictionary per result."""
+        try:
+            with open(input_path, 'rb') as f:
+                batch = orjson.loads(f.read())
+            fields = batch["schema"]
+            return [dict(zip(fields, row)) for row in batch["rows"]]
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            raise DocumentProcessingError(f"Could not load batch metadata from {input_path}: {e}")
+
     def save_metadata(self, metadata: Dict[str, Any], output_path: str):
         """Saves the extracted metadata to a JSON file."""
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=4)
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             logger.info(f"Metadata saved to {output_path}")
         except IOError as e:
             logger.error(f"Failed to save metadata to {output_path}: {e}")
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+import weakref
+import zlib
+import orjson
+from collections import OrderedDict
+from typing import Optional, Union
+from config.settings import DOCUMENT_STORE_DIR, DOCUMENT_STORE_MAX_IN_MEMORY, DOCUMENT_STORE_EXPIRATION_SECONDS, COMPRESS_MEMORY_STORE
+from core.cache_manager import prune_expired_files
+from core.models import DocumentResult
+from utils.logger import setup_logging
+
+logger = setup_logging(__name__)
+
+class DocumentStore:
+    """
+    Bounded store for processed documents.
+    The most recently used results are kept in memory; once more than `max_in_memory`
+    are held, the least recently used one is written to disk and dropped from memory.
+    Spilled results are loaded back transparently on lookup until they are older than
+    `expiration_seconds`; expired spill files are deleted on lookup and by a pruning pass at startup.
+    With `compress`, results held in memory are kept as zlib-compressed JSON instead of
+    pydantic models, trading a decode per lookup for a much smaller footprint.
+    """
+    def __init__(self, max_in_memory: int = DOCUMENT_STORE_MAX_IN_MEMORY, spill_dir: str = DOCUMENT_STORE_DIR,
+                 compress: bool = COMPRESS_MEMORY_STORE, expiration_seconds: float = DOCUMENT_STORE_EXPIRATION_SECONDS):
+        self.max_in_memory = max_in_memory
+        self.spill_dir = spill_dir
+        self.compress = compress
+        self.expiration_seconds = expiration_seconds
+        self._documents: "OrderedDict[str, Union[DocumentResult, bytes]]" = OrderedDict()
+        self._lock = threading.Lock() # Shared across request threads
+        if hasattr(os, "register_at_fork"):
+            # The pruner may hold the lock when gunicorn's preload_app forks a worker
+            store_ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: store_ref() and store_ref()._reset_lock())
+        if os.path.isdir(spill_dir):
+            # Delete results spilled by earlier runs in the background so startup doesn't wait on the walk
+            threading.Thread(target=self._prune_spilled, name="document-store-pruner", daemon=True).start()
+
+    def _reset_lock(self):
+        """Replaces the lock in a forked child, where a lock held by the parent's pruner would never be released."""
+        self._lock = threading.Lock()
+
+    def _prune_spilled(self):
+        """Deletes spill files older than the expiration time."""
+        removed = prune_expired_files(self.spill_dir, self.expiration_seconds, lock=self._lock)
+        if removed:
+            logger.info(f"Removed {removed} expired spilled documents from {self.spill_dir}")
+
+    def __setitem__(self, document_id: str, doc_result: DocumentResult):
+        with self._lock:
+            self._documents[document_id] = self._pack(doc_result)
+            self._documents.move_to_end(document_id)
+            while len(self._documents) > self.max_in_memory:
+                evicted_id, evicted_entry = self._documents.popitem(last=False)
+                self._spill(evicted_id, evicted_entry)
+
+    def __contains__(self, document_id: str) -> bool:
+        return self.get(document_id) is not None
+
+    def __len__(self) -> int:
+        """Returns the number of documents held in memory."""
+        return len(self._documents)
+
+    def get(self, document_id: str) -> Optional[DocumentResult]:
+        """Returns the stored result for an ID from memory or disk, or None if it is unknown."""
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None:
+                self._documents.move_to_end(document_id)
+        if entry is not None:
+            return self._unpack(entry)
+
+        doc_result = self._load_spilled(document_id)
+        if doc_result is not None:
+            self[document_id] = doc_result # Recently used again, so bring it back into memory
+        return doc_result
+
+    def _pack(self, doc_result: DocumentResult) -> Union[DocumentResult, bytes]:
+        """Returns the in-memory form of a result: the model itself, or compressed JSON."""
+        if not self.compress:
+            return doc_result
+        return zlib.compress(doc_result.to_json_bytes(), 1) # Fast level; metadata JSON still shrinks several-fold
+
+    def _unpack(self, entry: Union[DocumentResult, bytes]) -> DocumentResult:
+        """Returns the result held in an in-memory entry."""
+        if isinstance(entry, bytes):
+            return DocumentResult(**orjson.loads(zlib.decompress(entry)))
+        return entry
+
+    def _spill_path(self, document_id: str) -> Optional[str]:
+        """Returns the spill file path for an ID, or None if the ID is not a plain file name."""
+        if not document_id or os.path.basename(document_id) != document_id or document_id in (".", ".."):
+            return None
+        return os.path.join(self.spill_dir, f"{document_id}.json")
+
+    def _spill(self, document_id: str, entry: Union[DocumentResult, bytes]):
+        """Writes an evicted result to disk as plain JSON so it can still be looked up later."""
+        file_path = self._spill_path(document_id)
+        if file_path is None:
+            logger.warning(f"Dropping evicted document with unsafe ID: {document_id!r}")
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(file_path, 'wb') as f:
+                f.write(zlib.decompress(entry) if isinstance(entry, bytes) else entry.to_json_bytes())
+            logger.debug(f"Spilled document {document_id} to {file_path}")
+        except (IOError, TypeError, zlib.error) as e:
+            logger.error(f"Failed to spill document {document_id} to disk: {e}")
+
+    def _load_spilled(self, document_id: str) -> Optional[DocumentResult]:
+        """Reads a spilled result back from disk, treating unreadable files as missing."""
+        file_path = self._spill_path(document_id)
+        if file_path is None:
+            return None
+        try:
+            with open(file_path, 'rb') as f:
+                if time.time() - os.fstat(f.fileno()).st_mtime <= self.expiration_seconds:
+                    return DocumentResult(**orjson.loads(f.read()))
+        except FileNotFoundError:
+            return None
+        except (IOError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable spilled document {document_id}: {e}")
+            return None
+
+        logger.info(f"Deleting expired spilled document {document_id}")
+        try:
+            with self._lock:
+                os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        return None
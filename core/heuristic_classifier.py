@@ -0,0 +1,49 @@
+import re
+from typing import Dict, Any, List, Optional, Pattern
+from config.settings import DOCUMENT_TYPES
+from utils.logger import setup_logging
+
+logger = setup_logging(__name__)
+
+# Phrases that identify a document type far more reliably than its bare keywords
+STRONG_SIGNALS = {
+    "invoice": [r"invoice\s*(?:#|no\b|number)", r"\bamount due\b", r"\btax id\b", r"\bbill to\b", r"\bpayment terms\b"],
+    "contract": [r"\bthis agreement is (?:made|entered into)\b", r"\bhereinafter\b", r"\bin witness whereof\b", r"\bgoverning law\b"],
+    "report": [r"\bexecutive summary\b", r"\bquarterly report\b", r"\bfiscal (?:year|quarter)\b", r"\bkey (?:metrics|findings)\b"],
+}
+
+MIN_SCORE = 2 # Distinct signals a type needs before the LLM classification is skipped
+HEURISTIC_CONFIDENCE = 0.85
+
+def _compile_patterns() -> Dict[str, List[Pattern]]:
+    """Compiles the keyword and strong-signal patterns of every specific document type."""
+    patterns = {}
+    for doc_type, config in DOCUMENT_TYPES.items():
+        if doc_type == "other":
+            continue # Its keywords ("document", "form", ...) are too generic to decide on
+        keyword_patterns = [rf"\b{re.escape(keyword)}\b" for keyword in config.get("classification_keywords", [])]
+        patterns[doc_type] = [re.compile(p, re.IGNORECASE) for p in keyword_patterns + STRONG_SIGNALS.get(doc_type, [])]
+    return patterns
+
+_PATTERNS = _compile_patterns()
+
+def heuristic_classify(text_content: str) -> Optional[Dict[str, Any]]:
+    """
+    Classifies a document by keyword and phrase matches, without calling the LLM.
+    Each type scores one point per distinct pattern found in the text. Returns a classification
+    only when the best type reaches MIN_SCORE and strictly beats every other type; otherwise None.
+    """
+    scores = {
+        doc_type: sum(1 for pattern in patterns if pattern.search(text_content))
+        for doc_type, patterns in _PATTERNS.items()
+    }
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    if not ranked:
+        return None
+    best_type, best_score = ranked[0]
+    runner_up_score = ranked[1][1] if len(ranked) > 1 else 0
+    if best_score < MIN_SCORE or best_score == runner_up_score:
+        return None
+
+    logger.info(f"Document heuristically classified as: {best_type} (score {best_score}).")
+    return {"type": best_type, "confidence": HEURISTIC_CONFIDENCE}
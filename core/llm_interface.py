@@ -1,92 +1,253 @@
 import google.generativeai as genai
-import json
+import asyncio
+import orjson
+import random
 import time
-from typing import Dict, Any, Optional, List
-from config.settings import GEMINI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS, CACHE_ENABLED
+import weakref
+from typing import Dict, Any, Optional, List, NamedTuple, Tuple
+from config.settings import (
+    GEMINI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_MAX_CONCURRENCY,
+    LLM_RETRIES, LLM_REQUEST_DEADLINE_SECONDS, CACHE_ENABLED
+)
 from utils.logger import setup_logging
 from utils.exceptions import LLMAPIError
-from core.cache_manager import CacheManager
+from core.cache_manager import CacheManager, hash_text
 
 logger = setup_logging(__name__)
 
+STANDARD_OTHER_FIELDS = ["document_title", "author", "date_created", "subject"]
+
+RETRY_BACKOFF_CAP_SECONDS = 30 # Upper bound of the jittered backoff between retries
+
+# Prompt template versions. Cached responses are keyed on these rather than on the prompt
+# text, so bump a version whenever a prompt change should invalidate its cached responses.
+CLASSIFICATION_PROMPT_VERSION = "classification/v1"
+CLASSIFY_AND_EXTRACT_PROMPT_VERSION = "classify_and_extract/v1"
+CLASSIFY_AND_EXTRACT_BATCH_PROMPT_VERSION = "classify_and_extract_batch/v1"
+METADATA_PROMPT_VERSION = "metadata/v1"
+OTHER_ANALYSIS_PROMPT_VERSION = "other_analysis/v1"
+OTHER_EXTRACTION_PROMPT_VERSION = "other_extraction/v1"
+
+# How much of the document text each prompt includes
+CLASSIFICATION_TEXT_CHARS = 2000
+OTHER_ANALYSIS_TEXT_CHARS = 3000
+EXTRACTION_TEXT_CHARS = 4000 # Metadata extraction, including the fused classify-and-extract prompt
+MAX_PROMPT_TEXT_CHARS = max(CLASSIFICATION_TEXT_CHARS, OTHER_ANALYSIS_TEXT_CHARS, EXTRACTION_TEXT_CHARS)
+BATCH_DOCUMENT_MAX_CHARS = 1500 # Documents up to this length can share a batched classify-and-extract prompt
+
+# Response schema of the classify-and-extract prompt (one element of the batched response)
+CLASSIFY_AND_EXTRACT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "type": {"type": "STRING"},
+        "confidence": {"type": "NUMBER"},
+        "metadata": {"type": "OBJECT"}
+    },
+    "required": ["type", "confidence", "metadata"]
+}
+
+def _build_metadata_schema(metadata_fields: List[str]) -> Dict[str, Any]:
+    """Builds the JSON schema for extracting the given metadata fields."""
+    # Dynamically create JSON schema for metadata extraction
+    metadata_schema = {
+        "type": "OBJECT",
+        "properties": {field: {"type": "STRING"} for field in metadata_fields},
+        "required": [] # No fields are strictly required, LLM should return null if not found
+    }
+    # Special handling for 'line_items' if it's an expected field (example)
+    if "line_items" in metadata_fields:
+        metadata_schema["properties"]["line_items"] = {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "description": {"type": "STRING"},
+                    "quantity": {"type": "NUMBER"},
+                    "unit_price": {"type": "NUMBER"},
+                    "total": {"type": "NUMBER"}
+                },
+                "required": ["description"] # Example: only description is always required for line items
+            }
+        }
+    return metadata_schema
+
+class _RegistryIndex(NamedTuple):
+    """Prompt fragments derived from a document type registry, computed once per registry."""
+    specific_types_str: str # Comma-separated types other than "other"
+    type_fields_str: str # One "- type: field, field" line per specific type
+    fingerprint: str # Identifies the types and their fields in cache keys
+
+def _index_registry(document_types: Dict[str, Any]) -> _RegistryIndex:
+    """Builds the prompt fragments and cache fingerprint for a document type registry."""
+    specific_types = [t for t in document_types.keys() if t != "other"]
+    return _RegistryIndex(
+        specific_types_str=", ".join(specific_types),
+        type_fields_str="\n".join(
+            f"- {doc_type}: {', '.join(document_types[doc_type].get('metadata_fields', []))}"
+            for doc_type in specific_types
+        ),
+        fingerprint=";".join(
+            f"{doc_type}:{','.join(config.get('metadata_fields', []))}"
+            for doc_type, config in document_types.items()
+        )
+    )
+
 class LLMInterface:
+    """
+    Wrapper around the Gemini API for document classification and metadata extraction.
+    Every operation has a blocking form and an `a`-prefixed coroutine form; both share
+    the same prompt construction, response parsing, and response cache.
+    """
     def __init__(self):
         genai.configure(api_key=GEMINI_API_KEY)
         self.model = genai.GenerativeModel(LLM_MODEL)
         self.cache_manager = CacheManager()
+        self._async_semaphores = weakref.WeakKeyDictionary() # One concurrency limiter per event loop
+        self._registry = None # Last document type registry seen, and its index
+        self._registry_index = None
+        self._metadata_schemas: Dict[str, Dict[str, Any]] = {} # Metadata extraction schemas by schema key
+
+    def _get_registry_index(self, document_types: Dict[str, Any]) -> _RegistryIndex:
+        """Returns the prompt fragments and fingerprint of a registry, rebuilding them only when it changes."""
+        if document_types is not self._registry:
+            self._registry_index = _index_registry(document_types)
+            self._registry = document_types
+        return self._registry_index
+
+    def _get_registry_fingerprint(self, document_types: Dict[str, Any]) -> str:
+        """Returns a string identifying the types and metadata fields of a document type registry."""
+        return self._get_registry_index(document_types).fingerprint
+
+    def _content_cache_key(self, prompt_version: str, text_content: str, text_hash: Optional[str],
+                           schema: Optional[Dict[str, Any]], schema_key: Optional[str], variant: str = "") -> str:
+        """Returns the content-addressed cache key for a request about `text_content`."""
+        return self.cache_manager.generate_content_key(
+            text_hash or hash_text(text_content), prompt_version, schema, schema_key=schema_key, variant=variant
+        )
 
-    def _call_gemini_api(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """Returns the semaphore bounding concurrent Gemini calls on the running event loop."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        return semaphore
+
+    def _get_cached_response(self, cache_key: str) -> Optional[str]:
+        """Returns a cached LLM response for the key, if caching is enabled and the entry is fresh."""
+        if not CACHE_ENABLED:
+            return None
+        cached_response = self.cache_manager.get(cache_key)
+        if cached_response:
+            logger.info("LLM response retrieved from cache.")
+        return cached_response
+
+    def _prepare_request(self, prompt: str, schema: Optional[Dict[str, Any]]) -> Tuple[str, Any]:
+        """Builds the final prompt text and generation config for a Gemini request."""
+        generation_config = genai.types.GenerationConfig(
+            temperature=LLM_TEMPERATURE,
+            max_output_tokens=LLM_MAX_TOKENS
+        )
+        # If schema is provided, add JSON response format to prompt and configure for JSON
+        if schema:
+            prompt = f"{prompt}\n\nPlease respond with valid JSON only."
+        return prompt, generation_config
+
+    def _handle_response(self, response, cache_key: str) -> str:
+        """Extracts the text from a Gemini response and caches it."""
+        # Access the text from the response
+        if response and response.text:
+            response_text = response.text
+            if CACHE_ENABLED:
+                self.cache_manager.set(cache_key, response_text)
+            return response_text
+        raise LLMAPIError(f"LLM API returned an empty response")
+
+    def _retry_delay(self, attempt: int, deadline: float) -> Optional[float]:
+        """
+        Returns how long to wait before retrying after a failed attempt, or None to give up.
+        Full jitter keeps concurrent callers from retrying in lockstep after a shared failure
+        (e.g. rate limiting); a retry is abandoned if the wait would pass the request deadline.
+        """
+        if attempt >= LLM_RETRIES - 1:
+            return None
+        delay = random.uniform(0, min(2 ** attempt, RETRY_BACKOFF_CAP_SECONDS))
+        if time.monotonic() + delay > deadline:
+            logger.warning("Not retrying LLM API call: the request deadline would be exceeded.")
+            return None
+        return delay
+
+    def _call_gemini_api(self, prompt: str, schema: Optional[Dict[str, Any]] = None, schema_key: Optional[str] = None, cache_key: Optional[str] = None) -> str:
         """
         Internal method to call the Gemini API with retry logic and caching.
         Handles API failures gracefully.
+        `schema_key` names a fixed schema so its serialized form can be reused across calls.
+        `cache_key` overrides the default key derived from the full prompt and schema.
         """
-        # Generate a cache key from the prompt and schema
-        cache_key = self.cache_manager.generate_cache_key(prompt, schema)
+        # Generate a cache key from the prompt and schema unless the caller supplied one
+        if cache_key is None:
+            cache_key = self.cache_manager.generate_cache_key(prompt, schema, schema_key=schema_key)
 
         # Check cache first
-        if CACHE_ENABLED:
-            cached_response = self.cache_manager.get(cache_key)
-            if cached_response:
-                logger.info("LLM response retrieved from cache.")
-                return cached_response
+        cached_response = self._get_cached_response(cache_key)
+        if cached_response:
+            return cached_response
 
-        retries = 3
-        for i in range(retries):
+        request_prompt, generation_config = self._prepare_request(prompt, schema)
+        deadline = time.monotonic() + LLM_REQUEST_DEADLINE_SECONDS
+        for i in range(LLM_RETRIES):
             try:
-                # Prepare generation config
-                generation_config = genai.types.GenerationConfig(
-                    temperature=LLM_TEMPERATURE,
-                    max_output_tokens=LLM_MAX_TOKENS
-                )
-                
-                # If schema is provided, add JSON response format to prompt and configure for JSON
-                if schema:
-                    prompt_with_schema = f"{prompt}\n\nPlease respond with valid JSON only."
-                    response = self.model.generate_content(prompt_with_schema, generation_config=generation_config)
-                else:
-                    response = self.model.generate_content(prompt, generation_config=generation_config)
-
-                # Access the text from the response
-                if response and response.text:
-                    response_text = response.text
-                    if CACHE_ENABLED:
-                        self.cache_manager.set(cache_key, response_text)
-                    return response_text
-                else:
-                    raise LLMAPIError(f"LLM API returned an empty response")
+                response = self.model.generate_content(request_prompt, generation_config=generation_config)
+                return self._handle_response(response, cache_key)
+            except Exception as e:
+                logger.warning(f"LLM API call failed (attempt {i+1}/{LLM_RETRIES}): {e}")
+                delay = self._retry_delay(i, deadline)
+                if delay is None:
+                    raise LLMAPIError("Failed to get response from LLM API after multiple retries.", original_error=e)
+                time.sleep(delay)  # Jittered exponential backoff
+
+    async def _acall_gemini_api(self, prompt: str, schema: Optional[Dict[str, Any]] = None, schema_key: Optional[str] = None, cache_key: Optional[str] = None) -> str:
+        """
+        Coroutine counterpart of `_call_gemini_api`.
+        At most LLM_MAX_CONCURRENCY requests are in flight per event loop; backoff sleeps
+        release the slot so other documents can use it.
+        """
+        if cache_key is None:
+            cache_key = self.cache_manager.generate_cache_key(prompt, schema, schema_key=schema_key)
 
+        cached_response = self._get_cached_response(cache_key)
+        if cached_response:
+            return cached_response
+
+        request_prompt, generation_config = self._prepare_request(prompt, schema)
+        deadline = time.monotonic() + LLM_REQUEST_DEADLINE_SECONDS
+        for i in range(LLM_RETRIES):
+            try:
+                async with self._get_async_semaphore():
+                    response = await self.model.generate_content_async(request_prompt, generation_config=generation_config)
+                return self._handle_response(response, cache_key)
             except Exception as e:
-                logger.warning(f"LLM API call failed (attempt {i+1}/{retries}): {e}")
-                if i < retries - 1:
-                    time.sleep(2 ** i)  # Exponential backoff
-                else:
+                logger.warning(f"LLM API call failed (attempt {i+1}/{LLM_RETRIES}): {e}")
+                delay = self._retry_delay(i, deadline)
+                if delay is None:
                     raise LLMAPIError("Failed to get response from LLM API after multiple retries.", original_error=e)
+                await asyncio.sleep(delay)  # Jittered exponential backoff
 
     def _clean_json_response(self, response: str) -> str:
         """
         Clean up LLM response by removing markdown code blocks and extra whitespace.
         """
-        # Remove markdown code blocks
         response = response.strip()
-        if response.startswith('```json'):
-            response = response[7:]  # Remove ```json
-        elif response.startswith('```'):
-            response = response[3:]   # Remove ```
-        
-        if response.endswith('```'):
-            response = response[:-3]  # Remove trailing ```
-        
-        return response.strip()
-
-    def classify_document(self, text_content: str, document_types: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Uses LLM for zero-shot or few-shot document type classification.
-        Returns the document type and confidence score.
-        """
-        # Separate "other" from specific types for better prompt construction
-        specific_types = [t for t in document_types.keys() if t != "other"]
-        specific_types_str = ", ".join(specific_types)
-        
+        body = response.removeprefix('```json')
+        if len(body) == len(response):
+            body = response.removeprefix('```')
+        return body.removesuffix('```').strip()
+
+    def _build_classification_request(self, text_content: str, document_types: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Builds the classification prompt and its response schema."""
+        # Specific types are listed separately from "other" for better prompt construction
+        specific_types_str = self._get_registry_index(document_types).specific_types_str
+
         prompt = (
             f"Classify the following document content into one of these specific types: {specific_types_str}, "
             f"or 'other' if it doesn't clearly fit any of the specific categories.\n\n"
@@ -96,7 +257,7 @@ class LLMInterface:
             f"- Provide high confidence (0.8+) for clear matches, medium confidence (0.5-0.7) for likely matches, "
             f"and lower confidence (0.3-0.5) for uncertain classifications\n\n"
             f"Provide your answer as a JSON object with 'type' and 'confidence' (0.0 to 1.0).\n\n"
-            f"Document Content:\n```\n{text_content[:2000]}...\n```"
+            f"Document Content:\n```\n{text_content[:CLASSIFICATION_TEXT_CHARS]}...\n```"
         )
 
         # Define the JSON schema for classification response
@@ -108,74 +269,251 @@ class LLMInterface:
             },
             "required": ["type", "confidence"]
         }
+        return prompt, classification_schema
+
+    def _validate_classification(self, classification_data: Dict[str, Any], document_types: Dict[str, Any]) -> Dict[str, Any]:
+        """Checks a parsed classification, clamping its confidence and mapping unknown types to 'other'."""
+        # Basic validation
+        if "type" not in classification_data or "confidence" not in classification_data:
+            raise ValueError("LLM classification response missing 'type' or 'confidence'.")
+        if classification_data["confidence"] < 0 or classification_data["confidence"] > 1:
+             logger.warning(f"LLM returned out-of-range confidence: {classification_data['confidence']}. Clamping to [0,1].")
+             classification_data["confidence"] = max(0.0, min(1.0, classification_data["confidence"]))
+
+        # Handle unknown types by defaulting to "other"
+        if classification_data["type"] not in document_types:
+            logger.info(f"LLM classified document as unrecognized type '{classification_data['type']}'. Defaulting to 'other'.")
+            classification_data["type"] = "other"
+            classification_data["confidence"] = max(0.3, min(0.6, classification_data["confidence"]))  # Moderate confidence for fallback
 
+        logger.info(f"Document classified as: {classification_data['type']} with confidence: {classification_data['confidence']:.2f}")
+        return classification_data
+
+    def _parse_classification_response(self, raw_response: str, document_types: Dict[str, Any]) -> Dict[str, Any]:
+        """Parses and validates the LLM classification response."""
         try:
-            raw_response = self._call_gemini_api(prompt, schema=classification_schema)
             # Clean up response - remove markdown code blocks if present
             cleaned_response = self._clean_json_response(raw_response)
-            classification_data = json.loads(cleaned_response)
-            # Basic validation
-            if "type" not in classification_data or "confidence" not in classification_data:
-                raise ValueError("LLM classification response missing 'type' or 'confidence'.")
-            if classification_data["confidence"] < 0 or classification_data["confidence"] > 1:
-                 logger.warning(f"LLM returned out-of-range confidence: {classification_data['confidence']}. Clamping to [0,1].")
-                 classification_data["confidence"] = max(0.0, min(1.0, classification_data["confidence"]))
-
-            # Handle unknown types by defaulting to "other"
-            if classification_data["type"] not in document_types:
-                logger.info(f"LLM classified document as unrecognized type '{classification_data['type']}'. Defaulting to 'other'.")
-                classification_data["type"] = "other"
-                classification_data["confidence"] = max(0.3, min(0.6, classification_data["confidence"]))  # Moderate confidence for fallback
-
-            logger.info(f"Document classified as: {classification_data['type']} with confidence: {classification_data['confidence']:.2f}")
-            return classification_data
-        except (json.JSONDecodeError, ValueError) as e:
+            return self._validate_classification(orjson.loads(cleaned_response), document_types)
+        except (orjson.JSONDecodeError, ValueError) as e:
             raise LLMAPIError(f"Failed to parse LLM classification response: {e}. Raw response: {raw_response}", original_error=e)
-        except LLMAPIError:
-            raise # Re-raise LLMAPIError from _call_gemini_api
 
-    def extract_metadata(self, text_content: str, doc_type: str, metadata_fields: List[str]) -> Dict[str, Any]:
+    def classify_document(self, text_content: str, document_types: Dict[str, Any], text_hash: Optional[str] = None) -> Dict[str, Any]:
         """
-        Uses LLM to extract semantic metadata based on document type.
-        Handles cases where expected fields might be missing gracefully by LLM.
+        Uses LLM for zero-shot or few-shot document type classification.
+        Returns the document type and confidence score.
+        `text_hash` is the precomputed hash of `text_content`, if the caller already has it.
+        """
+        prompt, schema = self._build_classification_request(text_content, document_types)
+        cache_key = self._content_cache_key(CLASSIFICATION_PROMPT_VERSION, text_content, text_hash, schema, "classification",
+                                            variant=self._get_registry_fingerprint(document_types))
+        raw_response = self._call_gemini_api(prompt, schema=schema, schema_key="classification", cache_key=cache_key)
+        return self._parse_classification_response(raw_response, document_types)
+
+    async def aclassify_document(self, text_content: str, document_types: Dict[str, Any], text_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Coroutine counterpart of `classify_document`."""
+        prompt, schema = self._build_classification_request(text_content, document_types)
+        cache_key = self._content_cache_key(CLASSIFICATION_PROMPT_VERSION, text_content, text_hash, schema, "classification",
+                                            variant=self._get_registry_fingerprint(document_types))
+        raw_response = await self._acall_gemini_api(prompt, schema=schema, schema_key="classification", cache_key=cache_key)
+        return self._parse_classification_response(raw_response, document_types)
+
+    def _classify_and_extract_instructions(self, document_types: Dict[str, Any], answer_format: str) -> str:
+        """Returns the instructions shared by the single and batched classify-and-extract prompts."""
+        registry_index = self._get_registry_index(document_types)
+
+        return (
+            f"First classify the following document content into one of these specific types: {registry_index.specific_types_str}, "
+            f"or 'other' if it doesn't clearly fit any of the specific categories. "
+            f"Then extract the metadata fields listed for the chosen type.\n\n"
+            f"Metadata fields per type:\n{registry_index.type_fields_str}\n\n"
+            f"Guidelines:\n"
+            f"- Choose a specific type only if the document clearly matches that category\n"
+            f"- Use 'other' for documents like letters, memos, presentations, manuals, forms, or any general business documents\n"
+            f"- Provide high confidence (0.8+) for clear matches, medium confidence (0.5-0.7) for likely matches, "
+            f"and lower confidence (0.3-0.5) for uncertain classifications\n"
+            f"- Populate only the chosen type's fields; if a field is not found, include it with a null value. "
+            f"For 'other', leave metadata empty\n\n"
+            f"{answer_format}\n\n"
+        )
+
+    def _build_classify_and_extract_request(self, text_content: str, document_types: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Builds a single prompt that classifies the document and extracts the chosen type's metadata."""
+        prompt = (
+            self._classify_and_extract_instructions(
+                document_types,
+                "Provide your answer as a JSON object with 'type', 'confidence' (0.0 to 1.0) and 'metadata'."
+            )
+            + f"Document Content:\n```\n{text_content[:EXTRACTION_TEXT_CHARS]}...\n```"
+        )
+        return prompt, CLASSIFY_AND_EXTRACT_SCHEMA
+
+    def _build_classify_and_extract_batch_request(self, texts: List[str], document_types: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Builds one prompt that classifies and extracts metadata for several short documents."""
+        instructions = self._classify_and_extract_instructions(
+            document_types,
+            f"Apply this to each of the {len(texts)} documents below, independently. "
+            f"Provide your answer as a JSON array with exactly one object per document, in the same order; "
+            f"each object has 'type', 'confidence' (0.0 to 1.0) and 'metadata'."
+        )
+        documents = "\n\n".join(
+            f"Document {number}:\n```\n{text_content[:BATCH_DOCUMENT_MAX_CHARS]}\n```"
+            for number, text_content in enumerate(texts, start=1)
+        )
+        return instructions + documents, {"type": "ARRAY", "items": CLASSIFY_AND_EXTRACT_SCHEMA}
+
+    def _split_classify_and_extract(self, response_data: Any, document_types: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Splits one parsed classify-and-extract object into the classification and the metadata."""
+        if not isinstance(response_data, dict):
+            raise ValueError("LLM classification and extraction result is not an object.")
+        extracted_data = response_data.pop("metadata", None) or {}
+        if not isinstance(extracted_data, dict):
+            raise ValueError("LLM response 'metadata' is not an object.")
+        classification_data = self._validate_classification(response_data, document_types)
+
+        doc_type = classification_data["type"]
+        if doc_type == "other":
+            # Metadata for 'other' documents comes from the dynamic extraction instead
+            return classification_data, {}
+
+        # Ensure all expected fields are present, even if null, for consistency
+        for field in document_types.get(doc_type, {}).get("metadata_fields", []):
+            extracted_data.setdefault(field, None)
+
+        logger.info(f"Extracted metadata for {doc_type}: {extracted_data}")
+        return classification_data, extracted_data
+
+    def _parse_classify_and_extract_response(self, raw_response: str, document_types: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Parses the fused response into the classification and the extracted metadata."""
+        try:
+            cleaned_response = self._clean_json_response(raw_response)
+            return self._split_classify_and_extract(orjson.loads(cleaned_response), document_types)
+        except (orjson.JSONDecodeError, ValueError) as e:
+            raise LLMAPIError(f"Failed to parse LLM classification and extraction response: {e}. Raw response: {raw_response}", original_error=e)
+
+    def _parse_classify_and_extract_batch_response(self, raw_response: str, expected_count: int, document_types: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Parses a batched response into one (classification, metadata) pair per document."""
+        try:
+            cleaned_response = self._clean_json_response(raw_response)
+            response_data = orjson.loads(cleaned_response)
+            if not isinstance(response_data, list) or len(response_data) != expected_count:
+                raise ValueError(f"expected a JSON array of {expected_count} results")
+            return [self._split_classify_and_extract(item, document_types) for item in response_data]
+        except (orjson.JSONDecodeError, ValueError) as e:
+            raise LLMAPIError(f"Failed to parse LLM batch classification and extraction response: {e}. Raw response: {raw_response}", original_error=e)
+
+    def _classify_and_extract_cache_key(self, text_content: str, document_types: Dict[str, Any], text_hash: Optional[str]) -> str:
+        """Returns the content-addressed cache key of a single document's classify-and-extract response."""
+        return self._content_cache_key(CLASSIFY_AND_EXTRACT_PROMPT_VERSION, text_content, text_hash, CLASSIFY_AND_EXTRACT_SCHEMA,
+                                       "classify_and_extract", variant=self._get_registry_fingerprint(document_types))
+
+    def classify_and_extract(self, text_content: str, document_types: Dict[str, Any], text_hash: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Classifies a document and extracts the metadata for its type in a single LLM call.
+        Returns the classification and the metadata; metadata is empty for 'other' documents.
+        `text_hash` is the precomputed hash of `text_content`, if the caller already has it.
+        """
+        prompt, schema = self._build_classify_and_extract_request(text_content, document_types)
+        cache_key = self._classify_and_extract_cache_key(text_content, document_types, text_hash)
+        raw_response = self._call_gemini_api(prompt, schema=schema, schema_key="classify_and_extract", cache_key=cache_key)
+        return self._parse_classify_and_extract_response(raw_response, document_types)
+
+    async def aclassify_and_extract(self, text_content: str, document_types: Dict[str, Any], text_hash: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Coroutine counterpart of `classify_and_extract`."""
+        prompt, schema = self._build_classify_and_extract_request(text_content, document_types)
+        cache_key = self._classify_and_extract_cache_key(text_content, document_types, text_hash)
+        raw_response = await self._acall_gemini_api(prompt, schema=schema, schema_key="classify_and_extract", cache_key=cache_key)
+        return self._parse_classify_and_extract_response(raw_response, document_types)
+
+    def _prepare_classify_and_extract_batch(self, texts: List[str], document_types: Dict[str, Any],
+                                            text_hashes: List[str]) -> Tuple[List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]], List[str], List[int]]:
+        """
+        Looks up each document's own classify-and-extract cache entry.
+        Returns the results found (None for misses), every document's cache key, and the positions still to analyze.
+        """
+        cache_keys = [self._classify_and_extract_cache_key(text_content, document_types, text_hash)
+                      for text_content, text_hash in zip(texts, text_hashes)]
+        results: List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]] = [None] * len(texts)
+        for position, cache_key in enumerate(cache_keys):
+            cached_response = self._get_cached_response(cache_key)
+            if cached_response:
+                results[position] = self._parse_classify_and_extract_response(cached_response, document_types)
+        return results, cache_keys, [position for position, result in enumerate(results) if result is None]
+
+    def _batch_request(self, texts: List[str], cache_keys: List[str], document_types: Dict[str, Any]) -> Tuple[str, Dict[str, Any], str]:
+        """Builds the batched prompt for several documents, its schema, and the cache key of the whole batch."""
+        prompt, schema = self._build_classify_and_extract_batch_request(texts, document_types)
+        batch_hash = hash_text("|".join(cache_keys))
+        cache_key = self._content_cache_key(CLASSIFY_AND_EXTRACT_BATCH_PROMPT_VERSION, "", batch_hash, schema, "classify_and_extract_batch")
+        return prompt, schema, cache_key
+
+    def _complete_batch(self, results: List[Optional[Tuple[Dict[str, Any], Dict[str, Any]]]], cache_keys: List[str], missing: List[int],
+                        raw_response: str, document_types: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Fills in the analyses of a batched response and caches each one under its document's own key."""
+        analyses = self._parse_classify_and_extract_batch_response(raw_response, len(missing), document_types)
+        for position, (classification_data, metadata) in zip(missing, analyses):
+            results[position] = (classification_data, metadata)
+            if CACHE_ENABLED:
+                # Later single-document calls on the same text reuse this answer
+                self.cache_manager.set(cache_keys[position], orjson.dumps({**classification_data, "metadata": metadata}).decode("utf-8"))
+        return results
+
+    def classify_and_extract_batch(self, texts: List[str], document_types: Dict[str, Any], text_hashes: Optional[List[str]] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Classifies several short documents and extracts their metadata in a single LLM call.
+        Returns one (classification, metadata) pair per text, in input order.
+        Documents with a cached single-document answer are not sent again, and a lone remaining
+        document gets the single-document prompt. Each answer is cached per document.
+        Texts longer than BATCH_DOCUMENT_MAX_CHARS are truncated; use `classify_and_extract` for those.
         """
+        text_hashes = text_hashes or [hash_text(text_content) for text_content in texts]
+        results, cache_keys, missing = self._prepare_classify_and_extract_batch(texts, document_types, text_hashes)
+        if len(missing) == 1:
+            position = missing[0]
+            results[position] = self.classify_and_extract(texts[position], document_types, text_hash=text_hashes[position])
+        elif missing:
+            prompt, schema, cache_key = self._batch_request([texts[position] for position in missing], [cache_keys[position] for position in missing], document_types)
+            raw_response = self._call_gemini_api(prompt, schema=schema, schema_key="classify_and_extract_batch", cache_key=cache_key)
+            self._complete_batch(results, cache_keys, missing, raw_response, document_types)
+        return results
+
+    async def aclassify_and_extract_batch(self, texts: List[str], document_types: Dict[str, Any], text_hashes: Optional[List[str]] = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Coroutine counterpart of `classify_and_extract_batch`."""
+        text_hashes = text_hashes or [hash_text(text_content) for text_content in texts]
+        results, cache_keys, missing = self._prepare_classify_and_extract_batch(texts, document_types, text_hashes)
+        if len(missing) == 1:
+            position = missing[0]
+            results[position] = await self.aclassify_and_extract(texts[position], document_types, text_hash=text_hashes[position])
+        elif missing:
+            prompt, schema, cache_key = self._batch_request([texts[position] for position in missing], [cache_keys[position] for position in missing], document_types)
+            raw_response = await self._acall_gemini_api(prompt, schema=schema, schema_key="classify_and_extract_batch", cache_key=cache_key)
+            self._complete_batch(results, cache_keys, missing, raw_response, document_types)
+        return results
+
+    def _build_metadata_request(self, text_content: str, doc_type: str, metadata_fields: List[str]) -> Tuple[str, Dict[str, Any], str]:
+        """Builds the metadata extraction prompt, its response schema, and the schema key."""
         field_list_str = ", ".join(metadata_fields)
         prompt = (
             f"Extract the following key information from the {doc_type} document content provided: "
             f"{field_list_str}. "
             f"Provide your answer as a JSON object. For each field, provide the extracted value. "
             f"If a field is not found, include it with a null value. "
-            f"Document Content:\n```\n{text_content[:4000]}...\n```" # Adjust as needed for token limits
+            f"Document Content:\n```\n{text_content[:EXTRACTION_TEXT_CHARS]}...\n```" # Adjust as needed for token limits
         )
 
-        # Dynamically create JSON schema for metadata extraction
-        metadata_schema = {
-            "type": "OBJECT",
-            "properties": {field: {"type": "STRING"} for field in metadata_fields},
-            "required": [] # No fields are strictly required, LLM should return null if not found
-        }
-        # Special handling for 'line_items' if it's an expected field (example)
-        if "line_items" in metadata_fields:
-            metadata_schema["properties"]["line_items"] = {
-                "type": "ARRAY",
-                "items": {
-                    "type": "OBJECT",
-                    "properties": {
-                        "description": {"type": "STRING"},
-                        "quantity": {"type": "NUMBER"},
-                        "unit_price": {"type": "NUMBER"},
-                        "total": {"type": "NUMBER"}
-                    },
-                    "required": ["description"] # Example: only description is always required for line items
-                }
-            }
-
+        schema_key = f"metadata:{doc_type}:{field_list_str}"
+        # The schema only depends on the field list, so it is built once per type
+        metadata_schema = self._metadata_schemas.get(schema_key)
+        if metadata_schema is None:
+            metadata_schema = self._metadata_schemas[schema_key] = _build_metadata_schema(metadata_fields)
+        return prompt, metadata_schema, schema_key
 
+    def _parse_metadata_response(self, raw_response: str, doc_type: str, metadata_fields: List[str]) -> Dict[str, Any]:
+        """Parses the LLM metadata extraction response, filling missing fields with None."""
         try:
-            raw_response = self._call_gemini_api(prompt, schema=metadata_schema)
             # Clean up response - remove markdown code blocks if present
             cleaned_response = self._clean_json_response(raw_response)
-            extracted_data = json.loads(cleaned_response)
+            extracted_data = orjson.loads(cleaned_response)
 
             # Ensure all expected fields are present, even if null, for consistency
             for field in metadata_fields:
@@ -183,17 +521,29 @@ class LLMInterface:
 
             logger.info(f"Extracted metadata for {doc_type}: {extracted_data}")
             return extracted_data
-        except (json.JSONDecodeError, ValueError) as e:
+        except (orjson.JSONDecodeError, ValueError) as e:
             raise LLMAPIError(f"Failed to parse LLM metadata extraction response: {e}. Raw response: {raw_response}", original_error=e)
-        except LLMAPIError:
-            raise # Re-raise LLMAPIError from _call_gemini_api
 
-    def extract_dynamic_metadata_for_other(self, text_content: str) -> Dict[str, Any]:
+    def extract_metadata(self, text_content: str, doc_type: str, metadata_fields: List[str], text_hash: Optional[str] = None) -> Dict[str, Any]:
         """
-        For 'other' document types, first identify the most relevant metadata fields,
-        then extract them. This provides more intelligent metadata extraction for unknown document types.
+        Uses LLM to extract semantic metadata based on document type.
+        Handles cases where expected fields might be missing gracefully by LLM.
+        `text_hash` is the precomputed hash of `text_content`, if the caller already has it.
         """
-        # First, ask the LLM to identify relevant metadata fields
+        prompt, schema, schema_key = self._build_metadata_request(text_content, doc_type, metadata_fields)
+        cache_key = self._content_cache_key(METADATA_PROMPT_VERSION, text_content, text_hash, schema, schema_key, variant=doc_type)
+        raw_response = self._call_gemini_api(prompt, schema=schema, schema_key=schema_key, cache_key=cache_key)
+        return self._parse_metadata_response(raw_response, doc_type, metadata_fields)
+
+    async def aextract_metadata(self, text_content: str, doc_type: str, metadata_fields: List[str], text_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Coroutine counterpart of `extract_metadata`."""
+        prompt, schema, schema_key = self._build_metadata_request(text_content, doc_type, metadata_fields)
+        cache_key = self._content_cache_key(METADATA_PROMPT_VERSION, text_content, text_hash, schema, schema_key, variant=doc_type)
+        raw_response = await self._acall_gemini_api(prompt, schema=schema, schema_key=schema_key, cache_key=cache_key)
+        return self._parse_metadata_response(raw_response, doc_type, metadata_fields)
+
+    def _build_other_analysis_request(self, text_content: str) -> Tuple[str, Dict[str, Any]]:
+        """Builds the prompt asking the LLM which metadata fields matter for an 'other' document."""
         analysis_prompt = (
             f"Analyze this document and identify the 3-5 most important pieces of information "
             f"that should be extracted as metadata. Consider things like: titles, authors, dates, "
@@ -201,7 +551,7 @@ class LLMInterface:
             f"Respond with a JSON object containing:\n"
             f"1. 'suggested_fields': a list of field names that would be most valuable to extract\n"
             f"2. 'document_summary': a brief 1-2 sentence summary of what this document is about\n\n"
-            f"Document Content:\n```\n{text_content[:3000]}...\n```"
+            f"Document Content:\n```\n{text_content[:OTHER_ANALYSIS_TEXT_CHARS]}...\n```"
         )
 
         analysis_schema = {
@@ -212,56 +562,102 @@ class LLMInterface:
             },
             "required": ["suggested_fields", "document_summary"]
         }
+        return analysis_prompt, analysis_schema
 
-        try:
-            # Get field suggestions
-            raw_analysis = self._call_gemini_api(analysis_prompt, schema=analysis_schema)
-            cleaned_analysis = self._clean_json_response(raw_analysis)
-            analysis_data = json.loads(cleaned_analysis)
-            
-            suggested_fields = analysis_data.get("suggested_fields", [])
-            document_summary = analysis_data.get("document_summary", "")
-            
-            # Limit to reasonable number of fields and add our standard ones
-            standard_fields = ["document_title", "author", "date_created", "subject"]
-            all_fields = list(set(standard_fields + suggested_fields[:4]))  # Limit suggested fields
-            
-            logger.info(f"Dynamic metadata extraction for 'other' document. Fields: {all_fields}")
-            
-            # Now extract metadata for the identified fields
-            extraction_prompt = (
-                f"Extract the following information from this document: {', '.join(all_fields)}.\n\n"
-                f"Provide your answer as a JSON object. For each field, provide the extracted value. "
-                f"If a field is not found or not applicable, include it with a null value.\n\n"
-                f"Additional context: {document_summary}\n\n"
-                f"Document Content:\n```\n{text_content[:4000]}...\n```"
-            )
+    def _parse_other_analysis_response(self, raw_analysis: str) -> Tuple[List[str], str]:
+        """Parses the field analysis and returns the fields to extract and the document summary."""
+        cleaned_analysis = self._clean_json_response(raw_analysis)
+        analysis_data = orjson.loads(cleaned_analysis)
 
-            extraction_schema = {
-                "type": "OBJECT",
-                "properties": {field: {"type": "STRING"} for field in all_fields},
-                "required": []
-            }
+        suggested_fields = analysis_data.get("suggested_fields", [])
+        document_summary = analysis_data.get("document_summary", "")
 
-            raw_extraction = self._call_gemini_api(extraction_prompt, schema=extraction_schema)
-            cleaned_extraction = self._clean_json_response(raw_extraction)
-            extracted_data = json.loads(cleaned_extraction)
+        # Limit to reasonable number of fields and add our standard ones.
+        # Duplicates are dropped in order so the extraction prompt (and its cache key) is deterministic.
+        all_fields = list(dict.fromkeys(STANDARD_OTHER_FIELDS + suggested_fields[:4]))  # Limit suggested fields
 
-            # Ensure all fields are present
-            for field in all_fields:
-                extracted_data.setdefault(field, None)
-            
-            # Add the document summary as metadata
-            extracted_data["document_summary"] = document_summary
-            
-            logger.info(f"Dynamic metadata extraction completed for 'other' document: {extracted_data}")
-            return extracted_data
+        logger.info(f"Dynamic metadata extraction for 'other' document. Fields: {all_fields}")
+        return all_fields, document_summary
+
+    def _build_other_extraction_request(self, text_content: str, all_fields: List[str], document_summary: str) -> Tuple[str, Dict[str, Any]]:
+        """Builds the extraction prompt for the fields identified for an 'other' document."""
+        extraction_prompt = (
+            f"Extract the following information from this document: {', '.join(all_fields)}.\n\n"
+            f"Provide your answer as a JSON object. For each field, provide the extracted value. "
+            f"If a field is not found or not applicable, include it with a null value.\n\n"
+            f"Additional context: {document_summary}\n\n"
+            f"Document Content:\n```\n{text_content[:EXTRACTION_TEXT_CHARS]}...\n```"
+        )
+
+        extraction_schema = {
+            "type": "OBJECT",
+            "properties": {field: {"type": "STRING"} for field in all_fields},
+            "required": []
+        }
+        return extraction_prompt, extraction_schema
+
+    def _parse_other_extraction_response(self, raw_extraction: str, all_fields: List[str], document_summary: str) -> Dict[str, Any]:
+        """Parses the 'other' extraction response and attaches the document summary."""
+        cleaned_extraction = self._clean_json_response(raw_extraction)
+        extracted_data = orjson.loads(cleaned_extraction)
+
+        # Ensure all fields are present
+        for field in all_fields:
+            extracted_data.setdefault(field, None)
+
+        # Add the document summary as metadata
+        extracted_data["document_summary"] = document_summary
 
-        except (json.JSONDecodeError, ValueError) as e:
+        logger.info(f"Dynamic metadata extraction completed for 'other' document: {extracted_data}")
+        return extracted_data
+
+    def extract_dynamic_metadata_for_other(self, text_content: str, text_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        For 'other' document types, first identify the most relevant metadata fields,
+        then extract them. This provides more intelligent metadata extraction for unknown document types.
+        """
+        text_hash = text_hash or hash_text(text_content)
+        try:
+            # First, ask the LLM to identify relevant metadata fields
+            analysis_prompt, analysis_schema = self._build_other_analysis_request(text_content)
+            analysis_cache_key = self._content_cache_key(OTHER_ANALYSIS_PROMPT_VERSION, text_content, text_hash, analysis_schema, "other_analysis")
+            raw_analysis = self._call_gemini_api(analysis_prompt, schema=analysis_schema, schema_key="other_analysis", cache_key=analysis_cache_key)
+            all_fields, document_summary = self._parse_other_analysis_response(raw_analysis)
+
+            # Now extract metadata for the identified fields
+            extraction_prompt, extraction_schema = self._build_other_extraction_request(text_content, all_fields, document_summary)
+            extraction_cache_key = self._content_cache_key(OTHER_EXTRACTION_PROMPT_VERSION, text_content, text_hash, extraction_schema, None,
+                                                           variant=document_summary)
+            raw_extraction = self._call_gemini_api(extraction_prompt, schema=extraction_schema, cache_key=extraction_cache_key)
+            return self._parse_other_extraction_response(raw_extraction, all_fields, document_summary)
+
+        except (orjson.JSONDecodeError, ValueError) as e:
             logger.warning(f"Dynamic metadata extraction failed, falling back to standard fields: {e}")
             # Fallback to standard extraction
-            return self.extract_metadata(text_content, "other", ["document_title", "author", "date_created", "subject"])
+            return self.extract_metadata(text_content, "other", STANDARD_OTHER_FIELDS, text_hash=text_hash)
         except LLMAPIError as e:
             logger.warning(f"LLM API error during dynamic extraction, falling back: {e}")
             # Fallback to standard extraction
-            return self.extract_metadata(text_content, "other", ["document_title", "author", "date_created", "subject"]) 
\ No newline at end of file
+            return self.extract_metadata(text_content, "other", STANDARD_OTHER_FIELDS, text_hash=text_hash)
+
+    async def aextract_dynamic_metadata_for_other(self, text_content: str, text_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Coroutine counterpart of `extract_dynamic_metadata_for_other`."""
+        text_hash = text_hash or hash_text(text_content)
+        try:
+            analysis_prompt, analysis_schema = self._build_other_analysis_request(text_content)
+            analysis_cache_key = self._content_cache_key(OTHER_ANALYSIS_PROMPT_VERSION, text_content, text_hash, analysis_schema, "other_analysis")
+            raw_analysis = await self._acall_gemini_api(analysis_prompt, schema=analysis_schema, schema_key="other_analysis", cache_key=analysis_cache_key)
+            all_fields, document_summary = self._parse_other_analysis_response(raw_analysis)
+
+            extraction_prompt, extraction_schema = self._build_other_extraction_request(text_content, all_fields, document_summary)
+            extraction_cache_key = self._content_cache_key(OTHER_EXTRACTION_PROMPT_VERSION, text_content, text_hash, extraction_schema, None,
+                                                           variant=document_summary)
+            raw_extraction = await self._acall_gemini_api(extraction_prompt, schema=extraction_schema, cache_key=extraction_cache_key)
+            return self._parse_other_extraction_response(raw_extraction, all_fields, document_summary)
+
+        except (orjson.JSONDecodeError, ValueError) as e:
+            logger.warning(f"Dynamic metadata extraction failed, falling back to standard fields: {e}")
+            return await self.aextract_metadata(text_content, "other", STANDARD_OTHER_FIELDS, text_hash=text_hash)
+        except LLMAPIError as e:
+            logger.warning(f"LLM API error during dynamic extraction, falling back: {e}")
+            return await self.aextract_metadata(text_content, "other", STANDARD_OTHER_FIELDS, text_hash=text_hash)
@@ -1,6 +1,37 @@
-import uuid
+import os
+import threading
+import orjson
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field, ValidationError, field_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationError, field_validator
+
+_ID_POOL_SIZE = 512 # Random IDs drawn from the OS per refill
+_id_pool = bytearray()
+_id_pool_lock = threading.Lock()
+
+def _reset_id_pool():
+    """Discards the pooled random bytes so a forked worker never reuses its parent's IDs."""
+    global _id_pool_lock
+    _id_pool.clear()
+    _id_pool_lock = threading.Lock()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_pool)
+
+def generate_id() -> str:
+    """
+    Returns a new random identifier in the hyphenated UUID format documented for the API.
+    Random bytes are fetched from the OS for many IDs at once rather than one syscall per ID.
+    """
+    with _id_pool_lock:
+        if not _id_pool:
+            _id_pool.extend(os.urandom(16 * _ID_POOL_SIZE))
+        chunk = _id_pool[-16:]
+        del _id_pool[-16:]
+    # Set the UUID version 4 and RFC 4122 variant bits, then format without building a uuid.UUID
+    chunk[6] = (chunk[6] & 0x0F) | 0x40
+    chunk[8] = (chunk[8] & 0x3F) | 0x80
+    h = chunk.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
 
 class DocumentClassification(BaseModel):
     """Represents the classification of a document."""
@@ -14,13 +45,29 @@ class DocumentMetadata(BaseModel):
 
 class DocumentResult(BaseModel):
     """The complete structured output for a processed document."""
-    document_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="A unique identifier for the processed document.")
+    document_id: str = Field(default_factory=generate_id, description="A unique identifier for the processed document.")
     filename: str = Field(..., description="The original filename of the document.")
     classification: DocumentClassification = Field(..., description="The classification details of the document.")
     metadata: Dict[str, Any] = Field(..., description="A dictionary containing type-specific extracted metadata.")
     processing_status: str = Field("success", description="The status of the document processing ('success', 'failed', 'partial').")
     error_message: Optional[str] = Field(None, description="Detailed error message if processing failed or was partial.")
 
+    _serialized: Optional[Dict[str, Any]] = PrivateAttr(default=None) # Memoized model_dump() output
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the result as a dictionary, serializing it only on first use.
+        Results are not modified once stored, so the same dictionary is returned on every call;
+        callers must treat it as read-only.
+        """
+        if self._serialized is None:
+            self._serialized = self.model_dump()
+        return self._serialized
+
+    def to_json_bytes(self) -> bytes:
+        """Returns the result encoded as compact JSON, reusing the memoized dictionary."""
+        return orjson.dumps(self.to_dict(), option=orjson.OPT_NON_STR_KEYS)
+
     @field_validator('metadata')
     @classmethod
     def validate_metadata_structure(cls, v, info):
@@ -41,7 +88,9 @@ class DocumentResult(BaseModel):
 
 class ActionableItem(BaseModel):
     """Represents an actionable item extracted from a document."""
-    item_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="Unique ID for the actionable item.")
+    model_config = ConfigDict(defer_build=True) # Only the API uses it; built by warmup()
+
+    item_id: str = Field(default_factory=generate_id, description="Unique ID for the actionable item.")
     description: str = Field(..., description="A description of the actionable item.")
     status: str = Field("pending", description="Current status (e.g., 'pending', 'completed', 'overdue').")
     deadline: Optional[str] = Field(None, description="Optional deadline for the action, in YYYY-MM-DD format.")
@@ -50,19 +99,36 @@ class ActionableItem(BaseModel):
 
 class ApiErrorResponse(BaseModel):
     """Standardized error response for the API."""
+    model_config = ConfigDict(defer_build=True)
+
     code: str = Field(..., description="A unique error code.")
     message: str = Field(..., description="A human-readable error message.")
     details: Optional[Dict[str, Any]] = Field(None, description="Additional error details.")
 
 # Example of how you might define specific metadata models (not used directly in DocumentMetadata yet)
 class InvoiceMetadata(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     vendor: Optional[str]
     amount: Optional[str]
     due_date: Optional[str]
     line_items: List[Dict[str, Any]] = []
 
 class ContractMetadata(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     parties: List[str] = []
     effective_date: Optional[str]
     termination_date: Optional[str]
-    key_terms: List[str] = [] 
\ No newline at end of file
+    key_terms: List[str] = []
+
+# Models whose validation schemas are deferred but needed to serve API requests
+_API_MODELS = (ActionableItem,)
+
+def warmup():
+    """
+    Builds the deferred schemas of the models used while serving requests,
+    so the first request doesn't pay for it. Models never used stay unbuilt.
+    """
+    for model in _API_MODELS:
+        model.model_rebuild()
@@ -20,10 +20,19 @@ GEMINI_API_KEY="YOUR_GEMINI_API_KEY_HERE"
 GEMINI_MODEL="gemini-1.5-flash"
 LLM_TEMPERATURE="0.3"
 LLM_MAX_TOKENS="1024"
+LLM_MAX_CONCURRENCY="4"
+LLM_BATCH_MAX_DOCUMENTS="8"
+LLM_RETRIES="3"
+LLM_REQUEST_DEADLINE_SECONDS="60"
 
 # --- Caching Configuration ---
 CACHE_ENABLED="true"
 CACHE_EXPIRATION_TIME_SECONDS="3600"
+
+# --- Document Store Configuration ---
+DOCUMENT_STORE_MAX_IN_MEMORY="1024"
+DOCUMENT_STORE_EXPIRATION_SECONDS="604800"
+COMPRESS_MEMORY_STORE="false"
 """
 
     # Check if .env already exists
@@ -61,13 +70,14 @@ def show_current_config():
     try:
         from config.settings import (
             GEMINI_API_KEY, LLM_MODEL, LLM_TEMPERATURE, 
-            LLM_MAX_TOKENS, CACHE_ENABLED, CACHE_EXPIRATION_TIME_SECONDS
+            LLM_MAX_TOKENS, LLM_MAX_CONCURRENCY, CACHE_ENABLED, CACHE_EXPIRATION_TIME_SECONDS
         )
         
         print(f"   GEMINI_API_KEY: {'✅ Set' if GEMINI_API_KEY and GEMINI_API_KEY != 'YOUR_GEMINI_API_KEY_HERE' else '❌ Not set'}")
         print(f"   GEMINI_MODEL: {LLM_MODEL}")
         print(f"   LLM_TEMPERATURE: {LLM_TEMPERATURE}")
         print(f"   LLM_MAX_TOKENS: {LLM_MAX_TOKENS}")
+        print(f"   LLM_MAX_CONCURRENCY: {LLM_MAX_CONCURRENCY}")
         print(f"   CACHE_ENABLED: {CACHE_ENABLED}")
         print(f"   CACHE_EXPIRATION_TIME_SECONDS: {CACHE_EXPIRATION_TIME_SECONDS}")
         
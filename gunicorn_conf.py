@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for serving the Factify API in production.
+
+Usage (from the project root):
+    gunicorn -c gunicorn_conf.py 'api.app:create_app()'
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("FACTIFY_BIND", "127.0.0.1:5000")
+
+# Processed documents are kept in memory per process, so a document analyzed by one
+# worker is only visible to that worker. Keep a single worker by default and get
+# concurrency from threads; raise FACTIFY_WORKERS (up to the CPU count) only when
+# clients do not need to read back documents across requests.
+workers = min(int(os.getenv("FACTIFY_WORKERS", "1")), multiprocessing.cpu_count())
+worker_class = "gthread"
+threads = int(os.getenv("FACTIFY_THREADS", "8"))
+
+# Build the app (DocumentProcessor, LLM client) once in the master before forking workers
+preload_app = True
+
+# Document analysis waits on the LLM API, which can take well over gunicorn's 30s default
+timeout = int(os.getenv("FACTIFY_WORKER_TIMEOUT", "120"))
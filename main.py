@@ -1,5 +1,9 @@
 import os
+import asyncio
+import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 from config.settings import DOC_INPUT_DIR, DOC_OUTPUT_DIR
 from core.document_processor import DocumentProcessor
 from utils.logger import setup_logging
@@ -10,21 +14,50 @@ logger = setup_logging(__name__)
 
 def process_single_document(file_path: str, processor: DocumentProcessor):
     """Processes a single document and saves its metadata."""
+    filename = os.path.basename(file_path)
     try:
-        logger.info(f"Processing document: {os.path.basename(file_path)}")
-        metadata = processor.process_document(file_path)
+        logger.info(f"Processing document: {filename}")
+        metadata = processor.process_document(file_path, filename=filename)
 
         output_filename = os.path.join(DOC_OUTPUT_DIR, f"{metadata['document_id']}.json")
         processor.save_metadata(metadata, output_filename)
-        logger.info(f"Successfully processed {os.path.basename(file_path)}. Metadata saved to {output_filename}")
+        logger.info(f"Successfully processed {filename}. Metadata saved to {output_filename}")
         return metadata
     except DocumentProcessingError as e:
-        logger.error(f"Failed to process {os.path.basename(file_path)}: {e}")
+        logger.error(f"Failed to process {filename}: {e}")
         return None
     except Exception as e:
-        logger.error(f"An unexpected error occurred while processing {os.path.basename(file_path)}: {e}", exc_info=True)
+        logger.error(f"An unexpected error occurred while processing {filename}: {e}", exc_info=True)
         return None
 
+def process_documents_concurrently(file_paths: List[str], processor: DocumentProcessor, compact: bool = False):
+    """
+    Processes several documents concurrently and saves each one's metadata,
+    or, with `compact`, the metadata of all of them to a single batch file.
+    PDF text extraction is CPU-bound, so it is spread over worker processes;
+    the LLM calls stay on this process's event loop.
+    """
+    logger.info(f"Processing {len(file_paths)} documents concurrently.")
+    max_workers = min(len(file_paths), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=max_workers) as extraction_pool:
+        results = asyncio.run(processor.aprocess_batch(file_paths, extraction_executor=extraction_pool))
+    if compact:
+        output_filename = os.path.join(DOC_OUTPUT_DIR, f"batch_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        try:
+            processor.save_batch_metadata(results, output_filename)
+            logger.info(f"Successfully processed {len(results)} documents. Metadata saved to {output_filename}")
+        except DocumentProcessingError as e:
+            logger.error(f"Failed to save batch metadata: {e}")
+        return results
+    for metadata in results:
+        try:
+            output_filename = os.path.join(DOC_OUTPUT_DIR, f"{metadata['document_id']}.json")
+            processor.save_metadata(metadata, output_filename)
+            logger.info(f"Successfully processed {metadata['filename']}. Metadata saved to {output_filename}")
+        except DocumentProcessingError as e:
+            logger.error(f"Failed to process {metadata['filename']}: {e}")
+    return results
+
 def main():
     parser = argparse.ArgumentParser(description="Process documents and extract intelligent metadata.")
     parser.add_argument(
@@ -32,6 +65,11 @@ def main():
         type=str,
         help="Path to a single document to process. If not provided, all documents in DOC_INPUT_DIR will be processed."
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="When processing the input directory, save all results to one compact batch file instead of one file per document."
+    )
     args = parser.parse_args()
 
     # Ensure output directory exists
@@ -46,18 +84,21 @@ def main():
         process_single_document(args.document, processor)
     else:
         logger.info(f"Processing all documents in input directory: {DOC_INPUT_DIR}")
-        document_files = [
-            f for f in os.listdir(DOC_INPUT_DIR)
-            if f.endswith('.pdf') # or other supported formats
-        ]
+        # scandir yields full paths and usually knows the entry type without an extra stat
+        with os.scandir(DOC_INPUT_DIR) as entries:
+            pdf_entries = [
+                entry for entry in entries
+                if entry.is_file() and entry.name.lower().endswith('.pdf') # or other supported formats
+            ]
+        # Largest first, so the extraction pool isn't left waiting on one big file at the end
+        pdf_entries.sort(key=lambda entry: entry.stat().st_size, reverse=True)
+        file_paths = [entry.path for entry in pdf_entries]
 
-        if not document_files:
+        if not file_paths:
             logger.warning(f"No documents found in {DOC_INPUT_DIR} to process.")
             return
 
-        for filename in document_files:
-            file_path = os.path.join(DOC_INPUT_DIR, filename)
-            process_single_document(file_path, processor)
+        process_documents_concurrently(file_paths, processor, compact=args.compact)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
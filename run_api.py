@@ -2,13 +2,32 @@
 """
 Entry point script to run the Factify API server.
 This script should be run from the project root directory.
+
+By default the app is served by gunicorn with the settings in gunicorn_conf.py.
+Set FACTIFY_DEBUG=true to run the Flask development server with debug mode and the reloader instead.
 """
 
+import os
+import sys
+
 if __name__ == '__main__':
-    from api.app import create_app
-    
-    app = create_app()
+    debug = os.getenv("FACTIFY_DEBUG", "false").lower() in ["true", "1", "yes", "on"]
+
     print("Starting Factify API server...")
     print("API will be available at: http://127.0.0.1:5000")
     print("Health check endpoint: http://127.0.0.1:5000/health")
-    app.run(debug=True, port=5000) 
\ No newline at end of file
+
+    if not debug:
+        try:
+            from gunicorn.app.wsgiapp import run
+        except ImportError: # gunicorn is not available on Windows
+            print("gunicorn is not available; falling back to the threaded Flask server.")
+        else:
+            config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn_conf.py")
+            sys.argv = ["gunicorn", "-c", config_path, "api.app:create_app()"]
+            sys.exit(run())
+
+    from api.app import create_app
+
+    app = create_app()
+    app.run(debug=debug, port=5000, threaded=True)
@@ -0,0 +1,13 @@
+import pytest
+from core.document_processor import DocumentProcessor
+
+@pytest.fixture(scope="session")
+def document_processor():
+    """A DocumentProcessor built once per test session (once per worker under pytest-xdist)."""
+    return DocumentProcessor()
+
+@pytest.fixture(scope="class", autouse=True)
+def shared_document_processor(request, document_processor):
+    """Exposes the session's processor to unittest-style test classes as `cls.processor`."""
+    if request.cls is not None:
+        request.cls.processor = document_processor
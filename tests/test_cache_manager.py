@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from core import cache_manager
+from core.cache_manager import CacheManager, _TIMESTAMP_HEADER
+
+class TestCacheManager(unittest.TestCase):
+    """Tests for the file-based LLM response cache, run against a temporary cache directory."""
+
+    def setUp(self):
+        """Point the cache at an empty temporary directory."""
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = temp_dir.name
+        for name, value in (("CACHE_DIR", self.cache_dir), ("CACHE_ENABLED", True)):
+            patcher = patch.object(cache_manager, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache = CacheManager()
+
+    def test_set_get_round_trip(self):
+        """Test that a stored value is returned unchanged."""
+        self.cache.set("key", "Response with ünïcode")
+        self.assertEqual(self.cache.get("key"), "Response with ünïcode")
+        self.assertIsNone(self.cache.get("missing"))
+
+    def test_expired_entry_is_deleted(self):
+        """Test that an entry older than the expiration time is a miss and is removed."""
+        file_path = self.cache._get_cache_file_path("old")
+        with open(file_path, 'wb') as f:
+            f.write(_TIMESTAMP_HEADER.pack(time.time() - cache_manager.CACHE_EXPIRATION_TIME_SECONDS - 10))
+            f.write(b"stale")
+
+        self.assertIsNone(self.cache.get("old"))
+        self.assertFalse(os.path.exists(file_path))
+
+    def test_truncated_header_is_a_miss(self):
+        """Test that an entry shorter than its timestamp header is treated as a miss and removed."""
+        file_path = self.cache._get_cache_file_path("truncated")
+        with open(file_path, 'wb') as f:
+            f.write(b"\x00\x01\x02")
+
+        self.assertIsNone(self.cache.get("truncated"))
+        self.assertFalse(os.path.exists(file_path))
+
+    def test_prune_removes_files_by_mtime(self):
+        """Test that pruning removes files last modified before the expiration time and keeps fresh ones."""
+        self.cache.set("fresh", "new")
+        self.cache.set("stale", "old")
+        stale_path = self.cache._get_cache_file_path("stale")
+        old_mtime = time.time() - cache_manager.CACHE_EXPIRATION_TIME_SECONDS - 10
+        os.utime(stale_path, (old_mtime, old_mtime))
+
+        self.cache._prune_old_cache_files()
+
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertEqual(self.cache.get("fresh"), "new")
+
+    def test_failed_write_leaves_no_temp_file(self):
+        """Test that a write that cannot be swapped into place removes its temporary file."""
+        with patch.object(cache_manager.os, 'replace', side_effect=OSError("disk full")):
+            self.cache.set("key", "value")
+
+        self.assertEqual(os.listdir(self.cache_dir), [])
+        self.assertIsNone(self.cache.get("key"))
+
+if __name__ == '__main__':
+    unittest.main()
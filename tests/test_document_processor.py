@@ -1,6 +1,12 @@
+import asyncio
+import json
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 from core.document_processor import DocumentProcessor
+from core.document_store import DocumentStore
+from core.llm_interface import MAX_PROMPT_TEXT_CHARS, BATCH_DOCUMENT_MAX_CHARS
 from core.models import DocumentResult, DocumentClassification
 from utils.exceptions import DocumentProcessingError
 
@@ -8,8 +14,9 @@ class TestDocumentProcessor(unittest.TestCase):
     """Basic tests for the DocumentProcessor class."""
     
     def setUp(self):
-        """Set up test fixtures before each test method."""
-        self.processor = DocumentProcessor()
+        """Give each test the session's shared processor (see conftest.py) with an empty document store."""
+        self.processor = self.__class__.processor
+        self.processor.processed_documents = DocumentStore()
     
     def test_processor_initialization(self):
         """Test that the DocumentProcessor initializes correctly."""
@@ -35,6 +42,42 @@ class TestDocumentProcessor(unittest.TestCase):
         
         self.assertEqual(result, "Sample PDF text content")
     
+    @patch('core.document_processor.pypdf.PdfReader')
+    def test_extract_text_from_pdf_stops_after_prompt_limit(self, mock_pdf_reader):
+        """Test that extraction stops at, and trims to, the text any prompt uses."""
+        long_page = Mock()
+        long_page.extract_text.return_value = "x" * (MAX_PROMPT_TEXT_CHARS + 500)
+        unused_page = Mock()
+        mock_reader_instance = Mock()
+        mock_reader_instance.pages = [long_page, unused_page]
+        mock_pdf_reader.return_value = mock_reader_instance
+
+        with patch('builtins.open', unittest.mock.mock_open()):
+            result = self.processor._extract_text_from_pdf("long_document.pdf")
+
+        self.assertEqual(len(result), MAX_PROMPT_TEXT_CHARS)
+        unused_page.extract_text.assert_not_called()
+
+    @patch('core.document_processor.pypdf.PdfReader')
+    def test_extract_text_from_pdf_reuses_unchanged_file(self, mock_pdf_reader):
+        """Test that an unchanged file is parsed once and an edited one is parsed again."""
+        mock_page = Mock()
+        mock_page.extract_text.return_value = "Sample PDF text content"
+        mock_pdf_reader.return_value.pages = [mock_page]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pdf_path = os.path.join(tmp_dir, "document.pdf")
+            with open(pdf_path, 'wb') as f:
+                f.write(b"%PDF-1.4")
+            self.processor._extract_text_from_pdf(pdf_path)
+            self.processor._extract_text_from_pdf(pdf_path)
+            self.assertEqual(mock_pdf_reader.call_count, 1)
+
+            with open(pdf_path, 'ab') as f:
+                f.write(b"\n%%EOF")
+            self.processor._extract_text_from_pdf(pdf_path)
+            self.assertEqual(mock_pdf_reader.call_count, 2)
+
     @patch('core.document_processor.pypdf.PdfReader')
     def test_extract_text_from_pdf_empty(self, mock_pdf_reader):
         """Test PDF text extraction with empty content."""
@@ -51,11 +94,194 @@ class TestDocumentProcessor(unittest.TestCase):
             with self.assertRaises(DocumentProcessingError):
                 self.processor._extract_text_from_pdf(test_file_path)
     
+    def test_process_document_reuses_cached_analysis(self):
+        """Test that identical content is served from the analysis cache without re-processing."""
+        cached_analysis = json.dumps({
+            "classification": {"type": "invoice", "confidence": 0.9},
+            "metadata": {"vendor": "Acme Corp"}
+        })
+        with patch.object(self.processor.cache_manager, 'get', return_value=cached_analysis), \
+             patch.object(self.processor, '_extract_text_from_pdf') as mock_extract:
+            result = self.processor.process_document("/tmp/upload.pdf", filename="invoice.pdf", content_hash="abc123")
+
+        mock_extract.assert_not_called()
+        self.assertEqual(result["filename"], "invoice.pdf")
+        self.assertEqual(result["classification"]["type"], "invoice")
+        self.assertEqual(result["metadata"], {"vendor": "Acme Corp"})
+        self.assertIn(result["document_id"], self.processor.processed_documents)
+
+    def test_aprocess_batch_preserves_input_order(self):
+        """Test that concurrent batch processing returns one result per input, in order."""
+        async def classify_and_extract(text_content, document_types, text_hash=None):
+            return {"type": "report", "confidence": 0.8}, {"reporting_period": text_content}
+
+        with patch.object(self.processor, '_extract_text_from_pdf', side_effect=lambda path: path), \
+             patch.object(self.processor.llm_interface, 'aclassify_and_extract', side_effect=classify_and_extract):
+            results = asyncio.run(self.processor.aprocess_batch(["/tmp/q1.pdf", "/tmp/q2.pdf"]))
+
+        self.assertEqual([r["filename"] for r in results], ["q1.pdf", "q2.pdf"])
+        self.assertEqual([r["metadata"]["reporting_period"] for r in results], ["/tmp/q1.pdf", "/tmp/q2.pdf"])
+        self.assertTrue(all(r["processing_status"] == "success" for r in results))
+
+    def test_process_documents_batches_short_documents(self):
+        """Test that short documents share one LLM call while long ones are analyzed individually."""
+        texts = {"/tmp/a.pdf": "Invoice A", "/tmp/long.pdf": "x" * (BATCH_DOCUMENT_MAX_CHARS + 1), "/tmp/b.pdf": "Invoice B"}
+        invoice = ({"type": "invoice", "confidence": 0.9}, {"vendor": "Acme Corp"})
+        report = ({"type": "report", "confidence": 0.8}, {"reporting_period": "Q3"})
+
+        with patch.object(self.processor, '_extract_text_from_pdf', side_effect=texts.get), \
+             patch.object(self.processor.llm_interface, 'classify_and_extract_batch', return_value=[invoice, invoice]) as mock_batch, \
+             patch.object(self.processor.llm_interface, 'classify_and_extract', return_value=report) as mock_single:
+            results = self.processor.process_documents(list(texts))
+
+        mock_batch.assert_called_once()
+        self.assertEqual(mock_batch.call_args.args[0], ["Invoice A", "Invoice B"])
+        mock_single.assert_called_once()
+        self.assertEqual([r["filename"] for r in results], ["a.pdf", "long.pdf", "b.pdf"])
+        self.assertEqual([r["classification"]["type"] for r in results], ["invoice", "report", "invoice"])
+
+    def test_process_document_skips_llm_classification_for_clear_documents(self):
+        """Test that an unambiguous invoice is classified heuristically and only needs metadata extraction."""
+        text = "INVOICE #1042\nBill To: Example Ltd\nAmount due: $250.00"
+        with patch.object(self.processor, '_extract_text_from_pdf', return_value=text), \
+             patch.object(self.processor.llm_interface, 'extract_metadata', return_value={"vendor": "Acme Corp"}) as mock_extract, \
+             patch.object(self.processor.llm_interface, 'classify_and_extract') as mock_classify:
+            result = self.processor.process_document("/tmp/invoice.pdf")
+
+        mock_classify.assert_not_called()
+        self.assertEqual(mock_extract.call_args.args[1], "invoice")
+        self.assertEqual(result["classification"], {"type": "invoice", "confidence": 0.85})
+        self.assertEqual(result["metadata"], {"vendor": "Acme Corp"})
+
+    def test_batch_metadata_round_trip(self):
+        """Test that compact batch output reads back into the original result dictionaries."""
+        results = [
+            {"document_id": "doc-1", "filename": "a.pdf", "classification": {"type": "invoice", "confidence": 0.9},
+             "metadata": {"vendor": "Acme Corp"}, "processing_status": "success", "error_message": None},
+            {"document_id": "doc-2", "filename": "b.pdf", "classification": None,
+             "metadata": {}, "processing_status": "failed", "error_message": "PDF file not found"},
+        ]
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, "batch.json")
+            self.processor.save_batch_metadata(results, output_path)
+            self.assertEqual(DocumentProcessor.load_batch_metadata(output_path), results)
+
     def test_get_document_metadata_not_found(self):
         """Test retrieving metadata for non-existent document."""
         result = self.processor.get_document_metadata("non-existent-id")
         self.assertIsNone(result)
     
+    def test_get_document_result_not_found(self):
+        """Test looking up a stored result for non-existent document."""
+        self.assertIsNone(self.processor.get_document_result("non-existent-id"))
+
+    def test_document_store_spills_and_reloads(self):
+        """Test that results evicted from memory are still found via their spill file."""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            store = DocumentStore(max_in_memory=1, spill_dir=spill_dir)
+            for document_id in ("doc-1", "doc-2"):
+                store[document_id] = DocumentResult(
+                    document_id=document_id,
+                    filename=f"{document_id}.pdf",
+                    classification=DocumentClassification(type="report", confidence=0.7),
+                    metadata={"reporting_period": "Q1"}
+                )
+
+            self.assertEqual(len(store), 1)
+            self.assertTrue(os.path.exists(os.path.join(spill_dir, "doc-1.json")))
+            reloaded = store.get("doc-1")
+            self.assertEqual(reloaded.filename, "doc-1.pdf")
+            self.assertEqual(reloaded.metadata, {"reporting_period": "Q1"})
+            self.assertIsNone(store.get("../doc-1"))
+
+    def test_document_store_expires_spilled_results(self):
+        """Test that spill files past the expiration time are neither loaded nor kept."""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            store = DocumentStore(max_in_memory=1, spill_dir=spill_dir, expiration_seconds=60)
+            for document_id in ("doc-1", "doc-2"):
+                store[document_id] = DocumentResult(
+                    document_id=document_id,
+                    filename=f"{document_id}.pdf",
+                    classification=DocumentClassification(type="report", confidence=0.7),
+                    metadata={}
+                )
+            spill_path = os.path.join(spill_dir, "doc-1.json")
+            os.utime(spill_path, (0, 0))
+
+            self.assertIsNone(store.get("doc-1"))
+            self.assertFalse(os.path.exists(spill_path))
+
+            stale_path = os.path.join(spill_dir, "stale.json")
+            with open(stale_path, 'wb') as f:
+                f.write(b"{}")
+            os.utime(stale_path, (0, 0))
+            DocumentStore(spill_dir=spill_dir, expiration_seconds=60)._prune_spilled()
+            self.assertFalse(os.path.exists(stale_path))
+
+    def test_document_store_compressed_round_trip(self):
+        """Test that a compressing store returns results equal to the ones stored."""
+        with tempfile.TemporaryDirectory() as spill_dir:
+            store = DocumentStore(max_in_memory=1, spill_dir=spill_dir, compress=True)
+            first, second = (
+                DocumentResult(
+                    document_id=document_id,
+                    filename=f"{document_id}.pdf",
+                    classification=DocumentClassification(type="invoice", confidence=0.9),
+                    metadata={"vendor": "Acme Corp", "line_items": [{"description": "Widgets"}]}
+                )
+                for document_id in ("doc-1", "doc-2")
+            )
+            store["doc-1"] = first
+            store["doc-2"] = second # Evicts doc-1 to disk
+
+            self.assertEqual(store.get("doc-2").to_dict(), second.to_dict())
+            self.assertEqual(store.get("doc-1").to_dict(), first.to_dict())
+
+    def test_get_document_metadata_reuses_serialized_result(self):
+        """Test that the result is serialized once and metadata descriptions don't alter it."""
+        doc_result = DocumentResult(
+            document_id="report-1",
+            filename="report.pdf",
+            classification=DocumentClassification(type="report", confidence=0.8),
+            metadata={"reporting_period": "Q2"}
+        )
+        self.processor.processed_documents[doc_result.document_id] = doc_result
+
+        response = self.processor.get_document_metadata("report-1")
+        self.assertEqual(response["metadata"]["reporting_period"]["value"], "Q2")
+        self.assertIs(doc_result.to_dict(), doc_result.to_dict())
+        self.assertEqual(doc_result.to_dict()["metadata"], {"reporting_period": "Q2"})
+
+    def test_get_actionable_items_invoice(self):
+        """Test invoice actions from plain and {"value": ...} wrapped metadata, with filtering."""
+        doc_result = DocumentResult(
+            document_id="invoice-1",
+            filename="invoice.pdf",
+            classification=DocumentClassification(type="invoice", confidence=0.9),
+            metadata={
+                "amount": {"value": "$100"},
+                "due_date": "2024-01-31",
+                "vendor": "Acme Corp",
+                "line_items": [{"description": "Widgets"}]
+            }
+        )
+        self.processor.processed_documents[doc_result.document_id] = doc_result
+
+        result = self.processor.get_actionable_items("invoice-1")
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0]["description"], "Pay invoice for $100 from Acme Corp.")
+        self.assertEqual(result[0]["deadline"], "2024-01-31")
+
+        high_priority = self.processor.get_actionable_items("invoice-1", priority="high")
+        self.assertEqual([item["source_field"] for item in high_priority], ["amount, due_date"])
+
+        pending_medium = self.processor.get_actionable_items("invoice-1", status="pending", priority="medium")
+        self.assertEqual([item["description"] for item in pending_medium], ["Review line item: Widgets"])
+        self.assertEqual(self.processor.get_actionable_items("invoice-1", status="overdue"), [])
+
+        doc_result.processing_status = "failed"
+        self.assertEqual(self.processor.get_actionable_items("invoice-1"), [])
+
     def test_get_actionable_items_not_found(self):
         """Test retrieving actionable items for non-existent document."""
         result = self.processor.get_actionable_items("non-existent-id")
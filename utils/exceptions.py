@@ -1,21 +1,30 @@
-from flask import jsonify
+import orjson
+from flask import Response
 
 class FactifyException(Exception):
     """Base exception for the Factify application."""
+    __slots__ = ("message", "status_code", "code", "details", "_cached_dict")
+
     def __init__(self, message, status_code=500, code="UNKNOWN_ERROR", details=None):
         super().__init__(message)
         self.message = message
         self.status_code = status_code
         self.code = code
         self.details = details or {}
+        self._cached_dict = None
 
     def to_dict(self):
-        """Converts the exception to a dictionary suitable for API response."""
-        return {
-            "code": self.code,
-            "message": self.message,
-            "details": self.details
-        }
+        """
+        Converts the exception to a dictionary suitable for API response.
+        The dictionary is built on first use and returned on every later call; callers must not modify it.
+        """
+        if self._cached_dict is None:
+            self._cached_dict = {
+                "code": self.code,
+                "message": self.message,
+                "details": self.details
+            }
+        return self._cached_dict
 
 class DocumentProcessingError(FactifyException):
     """Exception raised for errors during document processing (e.g., PDF parsing, LLM interaction)."""
@@ -43,9 +52,8 @@ class InvalidInputError(FactifyException):
 # Centralized error handler for Flask
 def handle_factify_exception(error: FactifyException):
     """Handles custom Factify exceptions for Flask API responses."""
-    response = jsonify(error.to_dict())
-    response.status_code = error.status_code
-    return response
+    # Encode directly; the error payload is a plain dict and needs no app JSON provider
+    return Response(orjson.dumps(error.to_dict()), status=error.status_code, mimetype="application/json")
 
 def register_error_handlers(app):
     """Registers custom error handlers with the Flask application."""
@@ -1,33 +1,62 @@
+import atexit
+import functools
 import logging
+import logging.handlers
 import os
+import queue
 from config.settings import LOG_FILE_PATH
 
+_CONSOLE_FORMATTER = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
+_FILE_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# One console handler shared by all loggers
+_CONSOLE_HANDLER = logging.StreamHandler()
+_CONSOLE_HANDLER.setFormatter(_CONSOLE_FORMATTER)
+
+# All loggers hand file records to one background listener, so logging never waits on disk writes
+_file_handler = None
+_queue_handler = None
+_queue_listener = None
+
+def _start_file_listener():
+    """Starts the listener thread that writes queued records to the log file."""
+    global _file_handler, _queue_handler, _queue_listener
+    if _file_handler is None:
+        os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
+        _file_handler = logging.FileHandler(LOG_FILE_PATH)
+        _file_handler.setFormatter(_FILE_FORMATTER)
+        _queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    else:
+        _queue_handler.queue = queue.SimpleQueue() # Fresh queue: the parent's may be mid-use at fork time
+    _queue_listener = logging.handlers.QueueListener(_queue_handler.queue, _file_handler)
+    _queue_listener.start()
+
+def _stop_file_listener():
+    """Flushes queued records to the log file and stops the listener thread."""
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
+_start_file_listener()
+atexit.register(_stop_file_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_start_file_listener) # Threads don't survive fork, e.g. gunicorn's preload_app
+
+@functools.lru_cache(maxsize=None)
 def setup_logging(name):
     """
     Sets up a consistent logging configuration for the application.
-    Logs to console and a file.
+    Logs to console and a file. File records are queued and written by a background thread.
+    Each named logger is configured once; later calls return it as is.
     """
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO) # Default logging level
 
-    # Ensure log directory exists
-    log_dir = os.path.dirname(LOG_FILE_PATH)
-    os.makedirs(log_dir, exist_ok=True)
+    # Console handler
+    if _CONSOLE_HANDLER not in logger.handlers:
+        logger.addHandler(_CONSOLE_HANDLER)
 
-    # Create formatters
-    console_formatter = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # File handler, via the queue
+    if _queue_handler not in logger.handlers:
+        logger.addHandler(_queue_handler)
 
-    # Console handler
-    if not any(isinstance(handler, logging.StreamHandler) for handler in logger.handlers):
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(console_formatter)
-        logger.addHandler(console_handler)
-
-    # File handler
-    if not any(isinstance(handler, logging.FileHandler) for handler in logger.handlers):
-        file_handler = logging.FileHandler(LOG_FILE_PATH)
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-
-    return logger 
\ No newline at end of file
+    return logger